@@ -0,0 +1,175 @@
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session, select
+from backend.models import User, Grade, Attendance, CourseAllocation, Subject, Room, ExamSchedule
+
+def build_incidence(student_ids: List[int], course_ids: List[str], pairs: List[Tuple[int, str]]):
+    """
+    Sparse students x courses 0/1 matrix from (student_id, course_id) enrolment pairs (duplicates are fine).
+    """
+    from scipy import sparse
+
+    student_index = {s: i for i, s in enumerate(student_ids)}
+    course_index = {c: i for i, c in enumerate(course_ids)}
+    rows = np.fromiter((student_index[s] for s, _ in pairs), dtype=np.int64, count=len(pairs))
+    cols = np.fromiter((course_index[c] for _, c in pairs), dtype=np.int64, count=len(pairs))
+    incidence = sparse.csr_matrix((np.ones(len(pairs), dtype=np.int32), (rows, cols)),
+                                  shape=(len(student_ids), len(course_ids)))
+    incidence.data[:] = 1 # collapse duplicate pairs
+    return incidence
+
+def conflict_graph(incidence):
+    """
+    One sparse product: C = A^T A. C[i, j] is the number of students taking both courses i and j,
+    its diagonal the enrolment per course. Returns (C without diagonal as CSR, enrolment).
+    """
+    shared = (incidence.T @ incidence).tocsr()
+    enrolment = shared.diagonal().astype(np.int64)
+    shared.setdiag(0)
+    shared.eliminate_zeros()
+    return shared, enrolment
+
+def dsatur_exam_slots(conflicts, enrolment: np.ndarray, room_capacities: List[int], max_slots: Optional[int] = None):
+    """
+    DSatur colouring of the course conflict graph with room packing: repeatedly takes the unplaced course
+    with the most distinct slots among its neighbours (ties: more neighbours, then more students) and
+    puts it in the lowest slot none of its neighbours uses that still has enough free rooms.
+    Rooms hold one exam per slot; an exam may be split over several rooms (best single room if one fits,
+    otherwise largest rooms first).
+    Returns (slot per course, -1 if unplaced; room indexes per course).
+    """
+    n = len(enrolment)
+    indptr, indices = conflicts.indptr, conflicts.indices
+    degree = np.diff(indptr)
+    capacities = np.asarray(room_capacities, dtype=np.int64)
+    by_size = np.argsort(-capacities, kind="stable")
+
+    slots = np.full(n, -1, dtype=np.int64)
+    rooms: List[List[int]] = [[] for _ in range(n)]
+    neighbour_slots = [0] * n # bitmask of slots used by neighbours
+    saturation = np.zeros(n, dtype=np.int64)
+    room_free: List[np.ndarray] = [] # per slot: which rooms are still free
+    done = np.zeros(n, dtype=bool)
+    # One comparable key per course: saturation first, then degree, then enrolment
+    tie_break = degree * (int(enrolment.max(initial=0)) + 1) + enrolment
+    scale = int(tie_break.max(initial=0)) + 1
+
+    for _ in range(n):
+        priority = saturation * scale + tie_break
+        priority[done] = -1
+        course = int(np.argmax(priority))
+        done[course] = True
+
+        chosen = None
+        for slot in range(len(room_free) + 1):
+            if max_slots is not None and slot >= max_slots:
+                break
+            if neighbour_slots[course] >> slot & 1:
+                continue
+            if slot == len(room_free):
+                room_free.append(np.ones(len(capacities), dtype=bool))
+            picked = pack_rooms(capacities, by_size, room_free[slot], int(enrolment[course]))
+            if picked is not None:
+                chosen = slot
+                break
+        if chosen is None:
+            continue
+
+        slots[course] = chosen
+        rooms[course] = picked
+        room_free[chosen][picked] = False
+        bit = 1 << chosen
+        for neighbour in indices[indptr[course]:indptr[course + 1]].tolist():
+            if not done[neighbour] and not neighbour_slots[neighbour] & bit:
+                neighbour_slots[neighbour] |= bit
+                saturation[neighbour] += 1
+    return slots, rooms
+
+def pack_rooms(capacities: np.ndarray, by_size: np.ndarray, free: np.ndarray, students: int) -> Optional[List[int]]:
+    """
+    Rooms for `students` among the free ones: the smallest single room that fits, else the largest
+    free rooms until everyone is seated. None if the free rooms are too small together.
+    """
+    fits = np.flatnonzero(free & (capacities >= students))
+    if len(fits):
+        return [int(fits[np.argmin(capacities[fits])])]
+    picked, seated = [], 0
+    for room in by_size.tolist():
+        if free[room]:
+            picked.append(room)
+            seated += int(capacities[room])
+            if seated >= students:
+                return picked
+    return None
+
+class ExamScheduler:
+    """
+    Exam timetable: one slot per course so that no student has two exams at once.
+    Enrolments come from Grade and Attendance records and from students' sections
+    (every course allocated to their section).
+    """
+    def __init__(self, session: Session, sessions_per_day: int = 2, max_slots: Optional[int] = None):
+        self.session = session
+        self.sessions_per_day = sessions_per_day
+        self.max_slots = max_slots
+        self.stats: Dict = {}
+
+    def enrolments(self):
+        students = self.session.exec(select(User).where(User.role == "student")).all()
+        student_ids = [s.id for s in students]
+        known = set(student_ids)
+        pairs = [(g.student_id, g.course_id) for g in self.session.exec(select(Grade)).all()]
+        pairs += [(a.student_id, a.course_id) for a in self.session.exec(select(Attendance)).all()]
+
+        subjects = {s.id: s.code for s in self.session.exec(select(Subject)).all()}
+        section_courses = {}
+        for alloc in self.session.exec(select(CourseAllocation)).all():
+            section_courses.setdefault(alloc.section_id, set()).add(subjects[alloc.subject_id])
+        for student in students:
+            pairs += [(student.id, course) for course in section_courses.get(student.section, ())]
+
+        pairs = [(s, c) for s, c in pairs if s in known]
+        course_ids = sorted({c for _, c in pairs})
+        return student_ids, course_ids, pairs
+
+    def solve(self) -> List[ExamSchedule]:
+        try:
+            import scipy # noqa: F401
+        except ImportError:
+            raise ValueError("Exam scheduling needs SciPy (pip install scipy)")
+
+        started = time.monotonic()
+        rooms = self.session.exec(select(Room)).all()
+        if not rooms:
+            raise ValueError("No rooms available for exams")
+        student_ids, course_ids, pairs = self.enrolments()
+        if not course_ids:
+            raise ValueError("No enrolments found (grades, attendance or section allocations)")
+
+        conflicts, enrolment = conflict_graph(build_incidence(student_ids, course_ids, pairs))
+        too_big = [c for c, n in zip(course_ids, enrolment.tolist()) if n > sum(r.capacity for r in rooms)]
+        if too_big:
+            raise ValueError(f"Not enough room capacity for: {', '.join(too_big)}")
+
+        slots, room_sets = dsatur_exam_slots(conflicts, enrolment, [r.capacity for r in rooms], self.max_slots)
+        exams = []
+        for course, slot, picked, students in zip(course_ids, slots.tolist(), room_sets, enrolment.tolist()):
+            if slot < 0:
+                continue
+            label = f"Day {slot // self.sessions_per_day + 1}, Session {slot % self.sessions_per_day + 1}"
+            exams.append(ExamSchedule(course_id=course, slot=slot, slot_label=label,
+                                      rooms=", ".join(rooms[r].name for r in picked), students=students))
+
+        self.stats = {
+            "students": len(student_ids),
+            "courses": len(course_ids),
+            "conflict_edges": int(conflicts.nnz // 2),
+            "slots_used": int(slots.max() + 1) if (slots >= 0).any() else 0,
+            "unscheduled": [c for c, slot in zip(course_ids, slots.tolist()) if slot < 0],
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+        return exams
+
+    def report(self) -> Dict:
+        return self.stats
@@ -0,0 +1,342 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from backend.timetable_problem import TimetableProblem, HARD_CONSTRAINTS
+
+PERFECT_SCORE = 1000
+HARD_CONFLICT_PENALTY = 5000
+
+def count_collisions(keys: np.ndarray) -> np.ndarray:
+    """
+    keys: (population, allocations) int array.
+    Returns, per row, how many genes repeat a key already used earlier in that row
+    (the number of times calculate_fitness finds the key already in its busy set).
+    """
+    if keys.shape[1] < 2:
+        return np.zeros(keys.shape[0], dtype=np.int64)
+    ordered = np.sort(keys, axis=1)
+    return np.count_nonzero(ordered[:, 1:] == ordered[:, :-1], axis=1)
+
+def day_gaps(busy: np.ndarray) -> np.ndarray:
+    """
+    busy: (..., periods) bool. Idle periods between the first and last busy period of each row.
+    """
+    periods = busy.shape[-1]
+    count = busy.sum(axis=-1)
+    first = busy.argmax(axis=-1)
+    last = periods - 1 - busy[..., ::-1].argmax(axis=-1)
+    return np.where(count > 0, last - first + 1 - count, 0)
+
+def gap_table(n_periods: int) -> np.ndarray:
+    """
+    day_gaps of every busy mask, indexed by the mask's bits (bit k set = period k busy).
+    """
+    periods = np.arange(n_periods)
+    busy = (np.arange(1 << n_periods)[:, np.newaxis] >> periods) & 1 == 1
+    return day_gaps(busy)
+
+def mask_gaps(mask) -> int:
+    """
+    day_gaps of a single busy mask (bit k set = period k busy), with int bit operations.
+    """
+    mask = int(mask)
+    if not mask:
+        return 0
+    return mask.bit_length() - (mask & -mask).bit_length() + 1 - bin(mask).count("1")
+
+# Above this many periods a day the gap table gets too big and day_gaps runs on the occupancy instead
+MAX_TABLE_PERIODS = 16
+
+class PopulationFitnessEngine:
+    """
+    Scores a whole population in one batched pass.
+
+    The population is an int array of shape (population, allocations, 2) where
+    [..., 0] is the slot index and [..., 1] the room index of every gene.
+    Scores are identical to TimetableGeneticAlgorithm.calculate_fitness: PERFECT_SCORE minus
+    HARD_CONFLICT_PENALTY per hard conflict (clashes, classes in a closed room) minus the soft
+    penalty (availability preferences and the weighted DEFAULT_SOFT_WEIGHTS objectives).
+    A timetable is feasible when it has no hard conflicts, whatever its soft penalty.
+
+    With room_matching (two-phase mode) the room genes are ignored: rooms are assigned afterwards by
+    TimetableProblem.match_rooms, so instead of room collisions every class over a room group's
+    capacity at a time counts as one conflict (see TimetableProblem.room_groups).
+    """
+    def __init__(self, problem: TimetableProblem, room_matching=False):
+        self.problem = problem
+        self.room_matching = room_matching
+        if room_matching:
+            self.group_members, self.group_sizes = problem.room_groups()
+        self.gap_table = gap_table(problem.n_periods) if problem.n_periods <= MAX_TABLE_PERIODS else None
+
+    def hard_conflicts(self, population: np.ndarray) -> np.ndarray:
+        p = self.problem
+        times = p.slot_time_codes[population[..., 0]]   # (P, N)
+
+        # Combine (entity, time) into one integer key per constraint
+        conflicts = np.zeros(len(population), dtype=np.int64)
+        for constraint in HARD_CONSTRAINTS:
+            if constraint == "room" and self.room_matching:
+                conflicts += self.room_overflow(times)
+                continue
+            keys = p.entity_codes(constraint, population[..., 1]) * p.n_times + times
+            conflicts += count_collisions(np.broadcast_to(keys, times.shape))
+        if p.has_room_blocks and not self.room_matching:
+            conflicts += p.room_blocked[p.room_codes[population[..., 1]], times].sum(axis=1)
+        return conflicts
+
+    def soft_penalty(self, population: np.ndarray) -> np.ndarray:
+        """
+        Soft cost per row. Preferences and late classes are one lookup per gene; daily loads are
+        bincounts over (row, entity, day), and only teacher gaps keep the period axis.
+        """
+        p = self.problem
+        weights = p.soft_weights
+        times = p.slot_time_codes[population[..., 0]]
+        days = p.time_day[times]
+        rows = np.arange(len(population))[:, np.newaxis]
+        penalty = np.zeros(len(population), dtype=np.int64)
+        if p.has_preferences:
+            penalty += p.teacher_penalty[p.teacher_codes, times].sum(axis=1)
+        if weights["late_classes"]:
+            penalty += weights["late_classes"] * p.time_late[times].sum(axis=1)
+        if weights["section_daily_overload"]:
+            keys = (rows * p.n_sections + p.section_codes) * p.n_days + days
+            daily = np.bincount(keys.ravel(), minlength=len(population) * p.n_sections * p.n_days)
+            overload = np.maximum(daily - p.max_daily_classes, 0).reshape(len(population), -1)
+            penalty += weights["section_daily_overload"] * overload.sum(axis=1)
+        if weights["repeated_subject"]:
+            # courses x days is usually far larger than the genes, so sort instead of counting
+            keys = (p.course_codes * p.n_days + days).astype(np.int32)
+            penalty += weights["repeated_subject"] * count_collisions(keys)
+        if weights["teacher_gaps"]:
+            keys = ((rows * p.n_teachers + p.teacher_codes) * p.n_days + days) * p.n_periods + p.time_period[times]
+            counts = np.bincount(keys.ravel(), minlength=len(population) * p.n_teachers * p.n_days * p.n_periods)
+            busy = counts.reshape(len(population), p.n_teachers * p.n_days, p.n_periods) > 0
+            if self.gap_table is not None:
+                gaps = self.gap_table[busy @ (1 << np.arange(p.n_periods))]
+            else:
+                gaps = day_gaps(busy)
+            penalty += weights["teacher_gaps"] * gaps.sum(axis=1)
+        return penalty
+
+    def room_overflow(self, times: np.ndarray) -> np.ndarray:
+        """
+        Per row of (P, N) times: classes beyond each room group's open names, summed over groups and times.
+        """
+        n_times = self.problem.n_times
+        keys = np.arange(len(times))[:, np.newaxis] * n_times + times
+        overflow = np.zeros(len(times), dtype=np.int64)
+        for members, sizes in zip(self.group_members, self.group_sizes):
+            counts = np.bincount(keys[:, members].ravel(), minlength=len(times) * n_times)
+            overflow += np.maximum(counts.reshape(len(times), n_times) - sizes, 0).sum(axis=1)
+        return overflow
+
+    def score(self, population: np.ndarray) -> np.ndarray:
+        return PERFECT_SCORE - HARD_CONFLICT_PENALTY * self.hard_conflicts(population) - self.soft_penalty(population)
+
+class IncrementalFitness:
+    """
+    Occupancy counters of one chromosome keyed by (teacher, time), (room, time) and (section, time).
+    A single gene move updates the conflict count in O(1) instead of rescoring all genes.
+    The conflict count always equals PopulationFitnessEngine.hard_conflicts for the same chromosome
+    (closed rooms included), soft its soft_penalty. Soft costs are O(1) per move too: daily loads are
+    (section|course, day) counters and every (teacher, day) keeps a bit mask of its busy periods,
+    flipped in place when a teacher's period turns busy or free.
+    A local search / repair helper for moving single genes; whole populations are scored by
+    PopulationFitnessEngine.
+    """
+    def __init__(self, problem: TimetableProblem, chromosome: np.ndarray = None):
+        self.problem = problem
+        self.teacher_occ = np.zeros((problem.n_teachers, problem.n_times), dtype=np.int32)
+        self.room_occ = np.zeros((problem.n_room_names, problem.n_times), dtype=np.int32)
+        self.section_occ = np.zeros((problem.n_sections, problem.n_times), dtype=np.int32)
+        self.section_day = np.zeros((problem.n_sections, problem.n_days), dtype=np.int32)
+        self.course_day = np.zeros((problem.n_courses, problem.n_days), dtype=np.int32)
+        self.teacher_days = np.zeros((problem.n_teachers, problem.n_days), dtype=np.int64)
+        self.conflicts = 0
+        self.soft = 0
+        if chromosome is not None:
+            self.load(chromosome)
+
+    def load(self, chromosome: np.ndarray):
+        p = self.problem
+        times = p.slot_time_codes[chromosome[:, 0]]
+        for occ, entities in ((self.teacher_occ, p.teacher_codes),
+                              (self.room_occ, p.room_codes[chromosome[:, 1]]),
+                              (self.section_occ, p.section_codes)):
+            occ.fill(0)
+            np.add.at(occ, (entities, times), 1)
+        self.conflicts = int(sum(np.maximum(occ - 1, 0).sum()
+                                 for occ in (self.teacher_occ, self.room_occ, self.section_occ)))
+        self.conflicts += int(p.room_blocked[p.room_codes[chromosome[:, 1]], times].sum())
+        days = p.time_day[times]
+        for occ, entities in ((self.section_day, p.section_codes), (self.course_day, p.course_codes)):
+            occ.fill(0)
+            np.add.at(occ, (entities, days), 1)
+        teachers, busy_times = np.nonzero(self.teacher_occ)
+        self.teacher_days.fill(0)
+        np.bitwise_or.at(self.teacher_days, (teachers, p.time_day[busy_times]),
+                         np.left_shift(1, p.time_period[busy_times]).astype(np.int64))
+        self.soft = int(PopulationFitnessEngine(p).soft_penalty(chromosome[np.newaxis])[0])
+
+    @property
+    def score(self) -> int:
+        return PERFECT_SCORE - HARD_CONFLICT_PENALTY * self.conflicts - self.soft
+
+    def _availability(self, gene, slot, room):
+        # (closed room conflict, preference + late class cost) of one gene placement
+        p = self.problem
+        time = p.slot_time_codes[slot]
+        cost = p.teacher_penalty[p.teacher_codes[gene], time] + p.soft_weights["late_classes"] * p.time_late[time]
+        return int(p.room_blocked[p.room_codes[room], time]), int(cost)
+
+    def _flip_period(self, teacher, day, period):
+        # Marks one of the teacher's periods busy / free and returns the teacher gaps cost change
+        before = int(self.teacher_days[teacher, day])
+        after = before ^ (1 << int(period))
+        self.teacher_days[teacher, day] = after
+        return self.problem.soft_weights["teacher_gaps"] * (mask_gaps(after) - mask_gaps(before))
+
+    def _daily(self, gene, day, change):
+        # Updates the per-day section / course counts and returns the soft cost change
+        p = self.problem
+        weights = p.soft_weights
+        section, course = p.section_codes[gene], p.course_codes[gene]
+        before = (weights["section_daily_overload"] * max(self.section_day[section, day] - p.max_daily_classes, 0)
+                  + weights["repeated_subject"] * max(self.course_day[course, day] - 1, 0))
+        self.section_day[section, day] += change
+        self.course_day[course, day] += change
+        after = (weights["section_daily_overload"] * max(self.section_day[section, day] - p.max_daily_classes, 0)
+                 + weights["repeated_subject"] * max(self.course_day[course, day] - 1, 0))
+        return int(after - before)
+
+    def _keys(self, gene, slot, room):
+        p = self.problem
+        time = p.slot_time_codes[slot]
+        return ((self.teacher_occ, p.teacher_codes[gene], time),
+                (self.room_occ, p.room_codes[room], time),
+                (self.section_occ, p.section_codes[gene], time))
+
+    def _remove(self, gene, slot, room):
+        self._update(gene, slot, room, -1)
+
+    def _add(self, gene, slot, room):
+        self._update(gene, slot, room, 1)
+
+    def _update(self, gene, slot, room, change):
+        p = self.problem
+        teacher, time = p.teacher_codes[gene], p.slot_time_codes[slot]
+        for occ, entity, at in self._keys(gene, slot, room):
+            if change > 0 and occ[entity, at] >= 1:
+                self.conflicts += 1
+            elif change < 0 and occ[entity, at] >= 2:
+                self.conflicts -= 1
+            occ[entity, at] += change
+        blocked, cost = self._availability(gene, slot, room)
+        self.conflicts += change * blocked
+        self.soft += change * cost + self._daily(gene, p.time_day[time], change)
+        if self.teacher_occ[teacher, time] == (change > 0): # the teacher's first class there, or last one gone
+            self.soft += self._flip_period(teacher, p.time_day[time], p.time_period[time])
+
+    def move(self, chromosome: np.ndarray, gene: int, slot: int, room: int):
+        """
+        Moves chromosome[gene] to (slot, room) and updates the counters.
+        """
+        self._remove(gene, chromosome[gene, 0], chromosome[gene, 1])
+        chromosome[gene, 0] = slot
+        chromosome[gene, 1] = room
+        self._add(gene, slot, room)
+
+    def conflicting_genes(self, chromosome: np.ndarray) -> np.ndarray:
+        """
+        Indices of genes that share a (teacher|room|section, time) with another gene or sit in a closed room.
+        """
+        p = self.problem
+        times = p.slot_time_codes[chromosome[:, 0]]
+        rooms = p.room_codes[chromosome[:, 1]]
+        return np.flatnonzero((self.teacher_occ[p.teacher_codes, times] > 1)
+                              | (self.room_occ[rooms, times] > 1)
+                              | (self.section_occ[p.section_codes, times] > 1)
+                              | p.room_blocked[rooms, times])
+
+    def lift(self, chromosome: np.ndarray, gene: int):
+        """
+        Takes chromosome[gene] out of the counters (its value is left as is until place()).
+        """
+        self._remove(gene, chromosome[gene, 0], chromosome[gene, 1])
+
+    def placement_costs(self, gene: int) -> np.ndarray:
+        """
+        (rooms, slots) array: conflicts a lifted gene would add at every (slot, room).
+        """
+        p = self.problem
+        times = p.slot_time_codes
+        fixed = self.teacher_occ[p.teacher_codes[gene], times] + self.section_occ[p.section_codes[gene], times]
+        rooms = self.room_occ + p.room_blocked # a closed room counts like an occupied one
+        return fixed[np.newaxis, :] + rooms[p.room_codes[:, np.newaxis], times[np.newaxis, :]]
+
+    def place(self, chromosome: np.ndarray, gene: int, slot: int, room: int):
+        """
+        Puts a lifted gene back at (slot, room).
+        """
+        chromosome[gene, 0] = slot
+        chromosome[gene, 1] = room
+        self._add(gene, slot, room)
+
+class FitnessCache:
+    """
+    Bounded LRU cache of scores, keyed by a 16 byte BLAKE2 digest of a chromosome's slot/room vectors.
+    Keys are taken from the chromosome's bytes at lookup time and only scores are stored,
+    so chromosomes mutated in place afterwards simply hash to a different key.
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.last_hits = 0   # of the last score() call
+        self.last_misses = 0
+
+    @staticmethod
+    def key(chromosome: np.ndarray) -> bytes:
+        return hashlib.blake2b(np.ascontiguousarray(chromosome).tobytes(), digest_size=16).digest()
+
+    def score(self, population: np.ndarray, score_fn) -> np.ndarray:
+        """
+        Scores `population`, computing only cache misses (in one batch) with score_fn.
+        """
+        keys = [self.key(chromosome) for chromosome in population]
+        scores = np.empty(len(population), dtype=np.int64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.entries.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                self.entries.move_to_end(key)
+                scores[i] = cached
+
+        if missing:
+            computed = score_fn(population[missing])
+            scores[missing] = computed
+            for i, value in zip(missing, computed.tolist()):
+                self.entries[keys[i]] = value
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        self.last_hits = len(population) - len(missing)
+        self.last_misses = len(missing)
+        self.hits += self.last_hits
+        self.misses += self.last_misses
+        return scores
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def last_hit_rate(self) -> float:
+        total = self.last_hits + self.last_misses
+        return self.last_hits / total if total else 0.0
@@ -1,13 +1,24 @@
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Body
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Body, Query
 from sqlmodel import SQLModel, Session, select, Field
 from backend.database import engine, get_session, create_db_and_tables
-from backend.models import User, LoginRequest, Attendance, Grade, Schedule, Assignment, Submission, Message, Room, TimeSlot, Subject, CourseAllocation, Complaint
+from backend.models import User, LoginRequest, Attendance, Grade, Schedule, Assignment, Submission, Message, Room, TimeSlot, Subject, CourseAllocation, Complaint, TimetableVersion, Notification, ExamSchedule, Availability
 from backend.timetable_algorithm import TimetableGeneticAlgorithm
+from backend.scheduler_ai import create_solver
+from backend.timetable_store import (save_version, apply_repair, input_fingerprint, load_cached_generation, store_generation,
+                                     published_version_id, latest_version_id, version_rows, publish_version, rollback_version, checkpoint_path,
+                                     prune_checkpoints)
+from backend.timetable_jobs import timetable_jobs
+from backend.occupancy_index import published_occupancy, draft_occupancy, invalidate_occupancy
+from backend.timetable_diff import diff_versions, notify_changes
+from backend.exam_scheduler import ExamScheduler
 from backend.auth import verify_password
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 import os
+import json
+import asyncio
 import shutil
 import uuid
 from datetime import datetime
@@ -471,9 +482,12 @@ def get_schedule(
     section: Optional[str] = None, 
     faculty_id: Optional[int] = None, 
     published_only: bool = True, # Default to showing only published
+    version_id: Optional[int] = None, # A specific version instead of the published one / latest draft
     session: Session = Depends(get_session)
 ):
-    statement = select(Schedule)
+    if version_id is None:
+        version_id = published_version_id(session) if published_only else latest_version_id(session)
+    statement = select(Schedule).where(Schedule.version_id == version_id)
     
     if section:
         statement = statement.where(Schedule.section == section)
@@ -481,29 +495,147 @@ def get_schedule(
     if faculty_id:
         statement = statement.where(Schedule.faculty_id == faculty_id)
         
-    if published_only:
-        statement = statement.where(Schedule.is_published == True)
-        
     schedule = session.exec(statement).all()
     # Sort by Day and Start Time usually happening in frontend, but we can do it here too
     return schedule
 
 class PublishRequest(SQLModel):
-    section: Optional[str] = None
+    version_id: Optional[int] = None # Defaults to the latest draft
 
 @app.post("/publish-timetable")
-def publish_timetable(req: PublishRequest, session: Session = Depends(get_session)):
-    statement = select(Schedule)
-    if req.section:
-        statement = statement.where(Schedule.section == req.section)
-        
-    schedules = session.exec(statement).all()
-    for s in schedules:
-        s.is_published = True
-        session.add(s)
-    
-    session.commit()
-    return {"status": "success", "message": f"Published {len(schedules)} slots."}
+def publish_timetable(req: Optional[PublishRequest] = None, session: Session = Depends(get_session)):
+    """
+    Publishes a whole timetable version by switching the published pointer (one row update).
+    """
+    req = req or PublishRequest()
+    version = session.get(TimetableVersion, req.version_id or latest_version_id(session) or 0)
+    if not version:
+        raise HTTPException(status_code=404, detail="No timetable version to publish")
+    previous = published_version_id(session)
+    publish_version(session, version.id)
+    invalidate_occupancy()
+    notified = notify_published_changes(session, previous, version.id)
+    return {"status": "success", "version_id": version.id, "notified": notified, "message": f"Published {version.slots} slots."}
+
+def notify_published_changes(session: Session, old_version_id: Optional[int], new_version_id: int):
+    # Only sections and faculty whose classes changed hear about it (nothing on the very first publish)
+    if old_version_id is None or old_version_id == new_version_id:
+        return {"sections": 0, "faculty": 0}
+    diff = diff_versions(version_rows(session, old_version_id), version_rows(session, new_version_id))
+    return notify_changes(session, diff)
+
+@app.post("/timetable/rollback")
+def rollback_timetable(session: Session = Depends(get_session)):
+    """
+    Instantly re-publishes the version that was published before the current one.
+    """
+    pointer = rollback_version(session)
+    if pointer is None:
+        raise HTTPException(status_code=404, detail="No previously published version")
+    invalidate_occupancy()
+    notified = notify_published_changes(session, pointer.previous_version_id, pointer.version_id)
+    return {"status": "success", "version_id": pointer.version_id, "notified": notified}
+
+@app.get("/timetable/diff")
+def get_timetable_diff(from_version: Optional[int] = None, to_version: Optional[int] = None, session: Session = Depends(get_session)):
+    """
+    What changes between two versions (default: published -> latest draft), per (section, course, day, slot).
+    """
+    from_version = from_version or published_version_id(session)
+    to_version = to_version or latest_version_id(session)
+    return {"from_version": from_version, "to_version": to_version,
+            **diff_versions(version_rows(session, from_version), version_rows(session, to_version))}
+
+@app.get("/notifications")
+def get_notifications(section: Optional[str] = None, user_id: Optional[int] = None, session: Session = Depends(get_session)):
+    if section is None and user_id is None:
+        return []
+    statement = select(Notification)
+    if section is not None and user_id is not None:
+        statement = statement.where((Notification.section == section) | (Notification.user_id == user_id))
+    elif section is not None:
+        statement = statement.where(Notification.section == section)
+    else:
+        statement = statement.where(Notification.user_id == user_id)
+    return session.exec(statement.order_by(Notification.created_at.desc())).all()
+
+@app.get("/timetable/versions")
+def get_timetable_versions(session: Session = Depends(get_session)):
+    published = published_version_id(session)
+    versions = session.exec(select(TimetableVersion).order_by(TimetableVersion.id.desc())).all()
+    return [{**v.model_dump(), "is_published": v.id == published} for v in versions]
+
+# --- Occupancy Queries (published timetable) ---
+
+def slot_dicts(slots):
+    return [{"id": s.id, "day_of_week": s.day_of_week, "start_time": s.start_time, "end_time": s.end_time} for s in slots]
+
+@app.get("/occupancy/free-rooms")
+def get_free_rooms(day_of_week: str, start_time: str, session: Session = Depends(get_session)):
+    return {"free_rooms": published_occupancy.get(session).free_rooms(day_of_week, start_time)}
+
+@app.get("/occupancy/teachers/{faculty_id}/free-slots")
+def get_teacher_free_slots(faculty_id: int, session: Session = Depends(get_session)):
+    return {"free_slots": slot_dicts(published_occupancy.get(session).free_slots(teachers=[faculty_id]))}
+
+@app.get("/occupancy/common-free-slots")
+def get_common_free_slots(
+    faculty_ids: List[int] = Query(default=[]),
+    sections: List[str] = Query(default=[]),
+    rooms: List[str] = Query(default=[]),
+    session: Session = Depends(get_session)
+):
+    """
+    Slots where all the given teachers, sections and rooms are free, e.g. for an extra class or a meeting.
+    """
+    index = published_occupancy.get(session)
+    return {"free_slots": slot_dicts(index.free_slots(teachers=faculty_ids, sections=sections, rooms=rooms))}
+
+# --- Draft Validation ---
+
+class ScheduleMove(SQLModel):
+    schedule_id: int
+    day_of_week: str
+    start_time: str
+    room: Optional[str] = None # Keep the current room if not given
+
+class ScheduleSwap(SQLModel):
+    schedule_id: int
+    other_id: int
+
+class ValidateEditsRequest(SQLModel):
+    # A single move, a swap or any batch of both, checked together against the draft
+    moves: List[ScheduleMove] = []
+    swaps: List[ScheduleSwap] = []
+
+@app.post("/timetable/validate")
+def validate_timetable_edits(req: ValidateEditsRequest, session: Session = Depends(get_session)):
+    """
+    Checks proposed manual edits against the current draft without saving them.
+    Only the keys touched by the edited entries are looked at, so this is O(edits).
+    """
+    draft = draft_occupancy.get(session)
+    placements = {}
+    for swap in req.swaps:
+        if swap.schedule_id not in draft.rows or swap.other_id not in draft.rows:
+            missing = swap.schedule_id if swap.schedule_id not in draft.rows else swap.other_id
+            return {"valid": False, "errors": [{"schedule_id": missing, "error": "Schedule entry not found"}], "conflicts": []}
+        placements[swap.schedule_id] = draft.placement(swap.other_id)
+        placements[swap.other_id] = draft.placement(swap.schedule_id)
+    for move in req.moves:
+        room = move.room
+        if room is None:
+            room = draft.rows[move.schedule_id].room if move.schedule_id in draft.rows else ""
+        placements[move.schedule_id] = (move.day_of_week, move.start_time, room)
+    return draft.validate(placements)
+
+@app.get("/timetable/conflicts")
+def get_timetable_conflicts(session: Session = Depends(get_session)):
+    """
+    Full-schedule validation of the draft, server-side in a single pass.
+    """
+    conflicts = draft_occupancy.get(session).all_conflicts()
+    return {"valid": not conflicts, "conflicts": conflicts}
 
 # --- Timetable Setup Endpoints ---
 
@@ -512,6 +644,7 @@ def create_room(room: Room, session: Session = Depends(get_session)):
     session.add(room)
     session.commit()
     session.refresh(room)
+    invalidate_occupancy()
     return room
 
 @app.get("/rooms")
@@ -543,12 +676,59 @@ def create_timeslot(timeslot: TimeSlot, session: Session = Depends(get_session))
     session.add(timeslot)
     session.commit()
     session.refresh(timeslot)
+    invalidate_occupancy()
     return timeslot
 
 @app.get("/timeslots")
 def get_timeslots(session: Session = Depends(get_session)):
     return session.exec(select(TimeSlot)).all()
 
+AVAILABILITY_KINDS = ("unavailable", "preferred", "avoid")
+
+@app.post("/availability")
+def create_availability(entry: Availability, session: Session = Depends(get_session)):
+    """
+    Faculty unavailability / preferred or avoided times (user_id), or room closures (room_id).
+    Leave start_time empty for the whole day.
+    """
+    if (entry.user_id is None) == (entry.room_id is None):
+        raise HTTPException(status_code=400, detail="Give either user_id (faculty) or room_id")
+    if entry.kind not in AVAILABILITY_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(AVAILABILITY_KINDS)}")
+    if entry.user_id is not None:
+        user = session.get(User, entry.user_id)
+        if not user or user.role != "faculty":
+            raise HTTPException(status_code=404, detail="Faculty not found")
+    else:
+        if not session.get(Room, entry.room_id):
+            raise HTTPException(status_code=404, detail="Room not found")
+        if entry.kind != "unavailable":
+            raise HTTPException(status_code=400, detail="Rooms only support kind 'unavailable'")
+    session.add(entry)
+    session.commit()
+    session.refresh(entry)
+    invalidate_occupancy()
+    return entry
+
+@app.get("/availability")
+def get_availability(user_id: Optional[int] = None, room_id: Optional[int] = None, session: Session = Depends(get_session)):
+    query = select(Availability)
+    if user_id is not None:
+        query = query.where(Availability.user_id == user_id)
+    if room_id is not None:
+        query = query.where(Availability.room_id == room_id)
+    return session.exec(query).all()
+
+@app.delete("/availability/{entry_id}")
+def delete_availability(entry_id: int, session: Session = Depends(get_session)):
+    entry = session.get(Availability, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Availability entry not found")
+    session.delete(entry)
+    session.commit()
+    invalidate_occupancy()
+    return {"message": "Availability entry deleted"}
+
 @app.post("/allocations")
 def create_allocation(allocation: CourseAllocation, session: Session = Depends(get_session)):
     session.add(allocation)
@@ -560,26 +740,112 @@ def create_allocation(allocation: CourseAllocation, session: Session = Depends(g
 def get_allocations(session: Session = Depends(get_session)):
     return session.exec(select(CourseAllocation)).all()
 
+class GenerateTimetableRequest(SQLModel):
+    engine: str = "ga" # "ga" (genetic algorithm) or "cp" (exact constraint programming, needs OR-Tools)
+    population_size: int = 100
+    generations: int = 200
+    # Island model (islands > 1): sub-populations evolved in parallel worker processes
+    islands: int = 1
+    island_size: Optional[int] = None # Defaults to population_size // islands
+    island_workers: Optional[int] = None # Defaults to one process per island
+    migration_interval: int = 10
+    # Anytime stopping: return the best schedule found so far when either limit is hit
+    max_seconds: Optional[float] = 120.0
+    stagnation_generations: Optional[int] = None # Stop after this many generations without improvement
+    # Memetic refinement: tabu search on the elites every generation ("elite") or on the final best ("end")
+    local_search: Optional[str] = None
+    # LRU cache of scores for duplicate chromosomes (0 disables it)
+    fitness_cache_size: int = 10000
+    # Seed the GA with the current (published) timetable so small changes converge fast and stay close to it
+    warm_start: bool = False
+    # Solve independent departments (no shared teacher, section or room) separately in parallel
+    decompose: bool = False
+    # GA evolves slots only; rooms are assigned per slot by bipartite matching within capacity
+    two_phase: bool = False
+    # Score cost per class outside a teacher's preferred times or at an avoided time
+    preference_weight: int = 10
+    # Save the GA state every N generations (None disables); resume continues an interrupted identical run
+    checkpoint_interval: Optional[int] = 10
+    resume: bool = True
+    # Soft objectives: weights override DEFAULT_SOFT_WEIGHTS (teacher_gaps, section_daily_overload,
+    # repeated_subject, late_classes; 0 turns one off)
+    soft_weights: Optional[Dict[str, int]] = None
+    max_daily_classes: int = 6
+    late_periods: int = 1 # Last periods of the day that count as late
+    # Re-run even if an identical earlier run (same inputs and params) is cached
+    force: bool = False
+
+def generation_params(req: GenerateTimetableRequest) -> dict:
+    return {
+        "engine": req.engine,
+        "population_size": req.population_size,
+        "generations": req.generations,
+        "islands": req.islands,
+        "island_size": req.island_size,
+        "island_workers": req.island_workers,
+        "migration_interval": req.migration_interval,
+        "max_seconds": req.max_seconds,
+        "stagnation_generations": req.stagnation_generations,
+        "local_search": req.local_search,
+        "fitness_cache_size": req.fitness_cache_size,
+        "warm_start": req.warm_start,
+        "decompose": req.decompose,
+        "two_phase": req.two_phase,
+        "preference_weight": req.preference_weight,
+        "checkpoint_interval": req.checkpoint_interval,
+        "resume": req.resume,
+        "soft_weights": req.soft_weights,
+        "max_daily_classes": req.max_daily_classes,
+        "late_periods": req.late_periods,
+    }
+
+def generation_mode(req: GenerateTimetableRequest) -> str:
+    if req.engine == "cp":
+        return "Constraint Programming (CP-SAT)"
+    if req.decompose:
+        return "Genetic Algorithm (Decomposed)"
+    return "Genetic Algorithm (Island Model)" if req.islands > 1 else "Genetic Algorithm"
+
 @app.post("/generate-timetable")
-def generate_timetable(session: Session = Depends(get_session)):
+def generate_timetable(req: Optional[GenerateTimetableRequest] = None, session: Session = Depends(get_session)):
     """
-    Generate timetable using Genetic Algorithm for optimization.
+    Generate timetable using the selected engine (Genetic Algorithm by default).
+    Blocks until done; prefer /generate-timetable/jobs for long runs.
     """
-    # clear existing?
-    session.exec(Schedule.__table__.delete())
-    session.commit()
+    req = req or GenerateTimetableRequest()
 
     try:
-        optimizer = TimetableGeneticAlgorithm(session, population_size=100, generations=200)
-        optimized_schedule = optimizer.generate()
-        
-        for sched in optimized_schedule:
-            session.add(sched)
-        session.commit()
+        params = generation_params(req)
+        fingerprint = input_fingerprint(session, params)
+        cached = None if req.force else load_cached_generation(session, fingerprint)
+        if cached:
+            schedules, report = cached
+            version = save_version(session, schedules, "cache")
+            invalidate_occupancy()
+            return {
+                "message": f"Unchanged inputs. Restored {len(schedules)} slots from the previous run.",
+                "mode": generation_mode(req),
+                "cached": True,
+                "version_id": version.id,
+                **report
+            }
+
+        solver = create_solver(session, checkpoint_path=checkpoint_path(fingerprint, params), **params)
+        optimized_schedule = solver.solve()
+        report = solver.report()
+        prune_checkpoints()
+        store_generation(session, fingerprint, params, optimized_schedule, report)
+
+        # Saved as a new draft version; the published timetable only changes on publish
+        version = save_version(session, optimized_schedule, "generate")
+        invalidate_occupancy()
         
         return {
             "message": f"Optimization Complete. Generated {len(optimized_schedule)} slots.",
-            "mode": "Genetic Algorithm"
+            "mode": generation_mode(req),
+            "cached": False,
+            "version_id": version.id,
+            **report
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -587,6 +853,123 @@ def generate_timetable(session: Session = Depends(get_session)):
         print(e)
         raise HTTPException(status_code=500, detail="Optimization failed")
 
+class RepairTimetableRequest(SQLModel):
+    # Extra entries (sharing a teacher or section with the changed ones) that may move too
+    neighbourhood_size: int = 10
+    population_size: int = 50
+    generations: int = 200
+    max_seconds: Optional[float] = 30.0
+
+@app.post("/repair-timetable")
+def repair_timetable(req: Optional[RepairTimetableRequest] = None, session: Session = Depends(get_session)):
+    """
+    Incremental repair after allocations changed: existing conflict-free entries stay pinned,
+    only new / removed / conflicting allocations (plus a small neighbourhood) are re-solved.
+    """
+    req = req or RepairTimetableRequest()
+
+    try:
+        optimizer = TimetableGeneticAlgorithm(
+            session,
+            population_size=req.population_size,
+            generations=req.generations,
+            max_seconds=req.max_seconds
+        )
+        rows, orphans = optimizer.prepare_repair(version_rows(session, latest_version_id(session)), req.neighbourhood_size)
+        repaired = optimizer.generate()
+        counts, version = apply_repair(session, rows, orphans, repaired)
+        invalidate_occupancy()
+
+        return {
+            "message": f"Repair Complete. Re-solved {len(optimizer.free_genes)} of {len(repaired)} slots.",
+            "version_id": version.id,
+            **counts,
+            **optimizer.report()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- Exam Scheduling ---
+
+class ExamScheduleRequest(SQLModel):
+    sessions_per_day: int = 2
+    max_slots: Optional[int] = None # Unlimited by default; courses that don't fit are reported
+
+@app.post("/exam-schedule")
+def generate_exam_schedule(req: Optional[ExamScheduleRequest] = None, session: Session = Depends(get_session)):
+    """
+    Assigns every course an exam slot so no student sits two exams at once (graph colouring), with rooms packed by capacity.
+    """
+    req = req or ExamScheduleRequest()
+    try:
+        scheduler = ExamScheduler(session, sessions_per_day=req.sessions_per_day, max_slots=req.max_slots)
+        exams = scheduler.solve()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    session.exec(ExamSchedule.__table__.delete())
+    for exam in exams:
+        session.add(exam)
+    session.commit()
+    return {"message": f"Scheduled {len(exams)} exams.", **scheduler.report()}
+
+@app.get("/exam-schedule")
+def get_exam_schedule(session: Session = Depends(get_session)):
+    return session.exec(select(ExamSchedule).order_by(ExamSchedule.slot)).all()
+
+# --- Background Generation Jobs ---
+
+@app.post("/generate-timetable/jobs")
+def start_generation_job(req: Optional[GenerateTimetableRequest] = None):
+    """
+    Starts generation in a separate process and returns immediately with a job id.
+    A successful job saves a new draft version; nothing is published automatically.
+    """
+    req = req or GenerateTimetableRequest()
+    try:
+        job = timetable_jobs.submit(generation_params(req), force=req.force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
+@app.get("/generate-timetable/jobs/{job_id}")
+def get_generation_job(job_id: str):
+    job = timetable_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/generate-timetable/jobs/{job_id}/events")
+async def stream_generation_job(job_id: str):
+    """
+    Server-Sent Events: one "progress" event per generation (best score so far),
+    then a final "completed", "failed" or "cancelled" event.
+    """
+    job = timetable_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        sent = 0
+        while True:
+            finished = job.finished # read before draining so the terminal event is never missed
+            while sent < len(job.events):
+                event = job.events[sent]
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                sent += 1
+            if finished:
+                break
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/generate-timetable/jobs/{job_id}/cancel")
+def cancel_generation_job(job_id: str):
+    job = timetable_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 # ... existing code ...
 
 class UserProfileUpdate(SQLModel):
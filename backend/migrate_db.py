@@ -1,16 +1,62 @@
+from datetime import datetime
 from sqlmodel import create_engine, text
 
 # Adjust path if needed, assuming default sqlite.db in root or backend
 sqlite_url = "sqlite:///database.db"
 engine = create_engine(sqlite_url)
 
+COLUMNS = [
+    ("user", "parent_phone", "VARCHAR"),
+    ("room", "room_type", "VARCHAR NOT NULL DEFAULT 'lecture'"),
+    ("subject", "room_type", "VARCHAR NOT NULL DEFAULT 'lecture'"),
+    ("schedule", "version_id", "INTEGER REFERENCES timetableversion (id)"),
+]
+
+TABLES = [
+    """CREATE TABLE IF NOT EXISTS timetableversion (
+        id INTEGER NOT NULL PRIMARY KEY,
+        source VARCHAR NOT NULL,
+        created_at VARCHAR NOT NULL,
+        slots INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS publishedtimetable (
+        id INTEGER NOT NULL PRIMARY KEY,
+        version_id INTEGER REFERENCES timetableversion (id),
+        previous_version_id INTEGER REFERENCES timetableversion (id),
+        published_at VARCHAR
+    )""",
+]
+
+def migrate_schedule_versions(conn):
+    # Existing timetable rows become version 1; published if any of them was published
+    rows = conn.execute(text("SELECT COUNT(*), MAX(is_published) FROM schedule WHERE version_id IS NULL")).one()
+    if not rows[0]:
+        return
+    now = datetime.now().isoformat()
+    version_id = conn.execute(text("INSERT INTO timetableversion (source, created_at, slots) VALUES ('migration', :now, :slots)"),
+                              {"now": now, "slots": rows[0]}).lastrowid
+    conn.execute(text("UPDATE schedule SET version_id = :v WHERE version_id IS NULL"), {"v": version_id})
+    if rows[1]:
+        conn.execute(text("INSERT OR REPLACE INTO publishedtimetable (id, version_id, published_at) VALUES (1, :v, :now)"),
+                     {"v": version_id, "now": now})
+    conn.commit()
+    print(f"Moved {rows[0]} schedule rows into timetable version {version_id}.")
+
 def migrate():
     with engine.connect() as conn:
-        try:
-            conn.execute(text("ALTER TABLE user ADD COLUMN parent_phone VARCHAR;"))
-            print("Successfully added 'parent_phone' column.")
-        except Exception as e:
-            print(f"Migration failed (might already exist): {e}")
+        for statement in TABLES:
+            conn.execute(text(statement))
+        conn.commit()
+        for table, column, definition in COLUMNS:
+            try:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition};"))
+                conn.commit()
+                print(f"Successfully added '{table}.{column}' column.")
+            except Exception as e:
+                print(f"Migration of '{table}.{column}' failed (might already exist): {e}")
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_schedule_version_id ON schedule (version_id)"))
+        conn.commit()
+        migrate_schedule_versions(conn)
 
 if __name__ == "__main__":
     migrate()
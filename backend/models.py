@@ -44,7 +44,22 @@ class Schedule(SQLModel, table=True):
     start_time: str # 10:00
     end_time: str # 11:00
     room: str
-    is_published: bool = Field(default=False)
+    is_published: bool = Field(default=False) # Legacy flag; publishing now switches PublishedTimetable.version_id
+    version_id: Optional[int] = Field(default=None, foreign_key="timetableversion.id", index=True)
+
+class TimetableVersion(SQLModel, table=True):
+    # One per generation / repair run; its Schedule rows are never modified afterwards
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source: str # "generate", "repair", "cache", "migration"
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+    slots: int = 0
+
+class PublishedTimetable(SQLModel, table=True):
+    # Single row (id=1): the version students and faculty see
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version_id: Optional[int] = Field(default=None, foreign_key="timetableversion.id")
+    previous_version_id: Optional[int] = Field(default=None, foreign_key="timetableversion.id") # Rollback target
+    published_at: Optional[str] = None
 
 class Assignment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -90,6 +105,7 @@ class Room(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True) # e.g., "101", "Lab A"
     capacity: int
+    room_type: str = Field(default="lecture") # "lecture" or "lab"
 
 class TimeSlot(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -102,6 +118,17 @@ class Subject(SQLModel, table=True):
     name: str # "Mathematics"
     code: str = Field(index=True) # "MATH101"
     credits: int = 3
+    room_type: str = Field(default="lecture") # Room type it must be held in: "lecture" or "lab"
+
+class Availability(SQLModel, table=True):
+    # One day (or one period of it) for a faculty member (user_id) or a room (room_id)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    room_id: Optional[int] = Field(default=None, foreign_key="room.id", index=True)
+    day_of_week: str # "Monday"...
+    start_time: Optional[str] = None # None = the whole day
+    # "unavailable" (hard, faculty or room), "preferred" (faculty only; other times cost) or "avoid" (faculty; this time costs)
+    kind: str = Field(default="unavailable")
 
 class CourseAllocation(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -111,6 +138,32 @@ class CourseAllocation(SQLModel, table=True):
     # Constraint: One teacher per subject per section usually, but let's keep it flexible
     # We might add constraints later or via logic.
 
+class GenerationResult(SQLModel, table=True):
+    # Successful generation runs, keyed by a fingerprint of their inputs and solver params
+    id: Optional[int] = Field(default=None, primary_key=True)
+    fingerprint: str = Field(index=True, unique=True) # sha256 hex
+    params: str # JSON
+    schedule: str # JSON list of Schedule entries
+    report: str # JSON
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+
+class ExamSchedule(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    course_id: str = Field(index=True)
+    slot: int # 0-based exam slot
+    slot_label: str # "Day 1, Session 2"
+    rooms: str # comma separated, large exams span several rooms
+    students: int
+
+class Notification(SQLModel, table=True):
+    # Targeted notice for one section (its students) or one user (e.g. faculty)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    section: Optional[str] = Field(default=None, index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    title: str
+    content: str
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat())
+
 class Wallet(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
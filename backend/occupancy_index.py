@@ -0,0 +1,199 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+from sqlmodel import Session, select
+from backend.models import Schedule, TimeSlot, Room, Availability
+from backend.timetable_store import version_rows, published_version_id, latest_version_id
+
+class OccupancyIndex:
+    """
+    Busy times per room, teacher and section as bitmasks over the TimeSlots (bit i = self.slots[i]).
+    Like the generator, classes clash on (day, start_time): marking a class sets the bits of every
+    slot sharing its day and start time. Python ints are arbitrary-length bitsets, so a query is a
+    handful of AND / OR operations whatever the number of slots.
+    Times a faculty member is unavailable or a room is closed (Availability) are never free either.
+    """
+    def __init__(self, slots: List[TimeSlot], rooms: List[Room]):
+        self.slots = slots
+        self.room_names = list(dict.fromkeys(r.name for r in rooms))
+        self.room_ids = {r.id: r.name for r in rooms}
+        self.time_bits: Dict[tuple, int] = {} # (day, start_time) -> bits of the slots at that time
+        self.day_bits: Dict[str, int] = {} # day -> bits of all its slots
+        for i, slot in enumerate(slots):
+            key = (slot.day_of_week, slot.start_time)
+            self.time_bits[key] = self.time_bits.get(key, 0) | (1 << i)
+            self.day_bits[slot.day_of_week] = self.day_bits.get(slot.day_of_week, 0) | (1 << i)
+        self.all_bits = (1 << len(slots)) - 1
+        self.room_busy: Dict[str, int] = {}
+        self.teacher_busy: Dict[int, int] = {}
+        self.section_busy: Dict[str, int] = {}
+        self.room_closed: Dict[str, int] = {}
+        self.teacher_unavailable: Dict[int, int] = {}
+
+    def add(self, rows: Iterable[Schedule]):
+        for row in rows:
+            bits = self.time_bits.get((row.day_of_week, row.start_time), 0)
+            self.room_busy[row.room] = self.room_busy.get(row.room, 0) | bits
+            self.teacher_busy[row.faculty_id] = self.teacher_busy.get(row.faculty_id, 0) | bits
+            self.section_busy[row.section] = self.section_busy.get(row.section, 0) | bits
+
+    def block(self, entries: Iterable[Availability]):
+        """
+        Marks "unavailable" entries (faculty via user_id, rooms via room_id); an entry without
+        start_time covers its whole day. Preferred / avoided times are only costs for the generator.
+        """
+        for entry in entries:
+            if entry.kind != "unavailable":
+                continue
+            if entry.start_time is None:
+                bits = self.day_bits.get(entry.day_of_week, 0)
+            else:
+                bits = self.time_bits.get((entry.day_of_week, entry.start_time), 0)
+            if entry.user_id is not None:
+                self.teacher_unavailable[entry.user_id] = self.teacher_unavailable.get(entry.user_id, 0) | bits
+            elif entry.room_id in self.room_ids:
+                name = self.room_ids[entry.room_id]
+                self.room_closed[name] = self.room_closed.get(name, 0) | bits
+
+    def free_rooms(self, day: str, start_time: str) -> List[str]:
+        bits = self.time_bits.get((day, start_time))
+        if bits is None:
+            return []
+        return [name for name in self.room_names
+                if not (self.room_busy.get(name, 0) | self.room_closed.get(name, 0)) & bits]
+
+    def free_slots(self, teachers: Iterable[int] = (), sections: Iterable[str] = (), rooms: Iterable[str] = ()) -> List[TimeSlot]:
+        """
+        Slots where every given teacher, section and room is free (common free slots).
+        """
+        busy = 0
+        for teacher in teachers:
+            busy |= self.teacher_busy.get(teacher, 0) | self.teacher_unavailable.get(teacher, 0)
+        for section in sections:
+            busy |= self.section_busy.get(section, 0)
+        for room in rooms:
+            busy |= self.room_busy.get(room, 0) | self.room_closed.get(room, 0)
+        return self.slots_of(self.all_bits & ~busy)
+
+    def slots_of(self, bits: int) -> List[TimeSlot]:
+        return [slot for i, slot in enumerate(self.slots) if bits >> i & 1]
+
+class PublishedOccupancy:
+    """
+    OccupancyIndex over the published timetable version and the availability entries, kept in memory
+    between requests. Publishing, rollback and slot/room/availability edits only mark it stale; it is
+    rebuilt from the database on the next query.
+    """
+    def __init__(self):
+        self.index: Optional[OccupancyIndex] = None
+        self.lock = threading.Lock()
+
+    def get(self, session: Session) -> OccupancyIndex:
+        with self.lock:
+            if self.index is None:
+                index = OccupancyIndex(session.exec(select(TimeSlot)).all(), session.exec(select(Room)).all())
+                index.add(version_rows(session, published_version_id(session)))
+                index.block(session.exec(select(Availability).where(Availability.kind == "unavailable")).all())
+                self.index = index
+            return self.index
+
+    def invalidate(self):
+        with self.lock:
+            self.index = None
+
+published_occupancy = PublishedOccupancy()
+
+# Hard constraints of a Schedule row: (entity attribute, conflict type)
+ROW_CONSTRAINTS = (("faculty_id", "teacher"), ("room", "room"), ("section", "section"))
+
+class DraftOccupancy:
+    """
+    Occupancy maps over the rows of the current draft (latest version) for validating manual edits:
+    (entity, day, start_time) -> ids of the rows there, per hard constraint.
+    Checking a batch of edits only looks at the keys the edited rows leave and land on.
+    """
+    def __init__(self, rows: List[Schedule], slots: List[TimeSlot], rooms: List[Room]):
+        self.rows = {row.id: row for row in rows}
+        self.slot_ends = {(s.day_of_week, s.start_time): s.end_time for s in slots}
+        self.room_names = {r.name for r in rooms}
+        self.maps = {kind: {} for _, kind in ROW_CONSTRAINTS}
+        for row in rows:
+            for attr, kind in ROW_CONSTRAINTS:
+                self.maps[kind].setdefault((getattr(row, attr), row.day_of_week, row.start_time), set()).add(row.id)
+
+    def validate(self, placements: Dict[int, tuple]) -> Dict:
+        """
+        placements: row id -> proposed (day_of_week, start_time, room) for every edited row.
+        Returns {"valid", "errors", "conflicts"}; each conflict names the edited row, the
+        constraint, the time and the ids of the rows it would clash with.
+        """
+        errors = []
+        for row_id, (day, start, room) in placements.items():
+            if row_id not in self.rows:
+                errors.append({"schedule_id": row_id, "error": "Schedule entry not found"})
+            elif (day, start) not in self.slot_ends:
+                errors.append({"schedule_id": row_id, "error": f"No time slot on {day} at {start}"})
+            elif room not in self.room_names:
+                errors.append({"schedule_id": row_id, "error": f"Unknown room '{room}'"})
+        if errors:
+            return {"valid": False, "errors": errors, "conflicts": []}
+
+        # Where the edited rows land, per constraint
+        landing = {kind: {} for _, kind in ROW_CONSTRAINTS}
+        for row_id, (day, start, room) in placements.items():
+            row = self.rows[row_id]
+            for attr, kind in ROW_CONSTRAINTS:
+                entity = room if attr == "room" else getattr(row, attr)
+                landing[kind].setdefault((entity, day, start), set()).add(row_id)
+
+        conflicts = []
+        for kind, keys in landing.items():
+            for (entity, day, start), row_ids in keys.items():
+                # Rows already there that stay, plus other edited rows landing on the same key
+                staying = self.maps[kind].get((entity, day, start), set()) - placements.keys()
+                for row_id in sorted(row_ids):
+                    others = staying | (row_ids - {row_id})
+                    if others:
+                        conflicts.append({"schedule_id": row_id, "type": kind, "entity": entity,
+                                          "day_of_week": day, "start_time": start, "with": sorted(others)})
+        return {"valid": not conflicts, "errors": [], "conflicts": conflicts}
+
+    def all_conflicts(self) -> List[Dict]:
+        """
+        Full-schedule validation in one pass over the maps: every key holding more than one row.
+        """
+        return [{"type": kind, "entity": entity, "day_of_week": day, "start_time": start, "schedule_ids": sorted(row_ids)}
+                for kind, keys in self.maps.items()
+                for (entity, day, start), row_ids in keys.items() if len(row_ids) > 1]
+
+    def placement(self, row_id: int) -> tuple:
+        row = self.rows[row_id]
+        return row.day_of_week, row.start_time, row.room
+
+class CachedDraftOccupancy:
+    """
+    DraftOccupancy kept between requests; rebuilt after anything saves a new version.
+    """
+    def __init__(self):
+        self.index: Optional[DraftOccupancy] = None
+        self.lock = threading.Lock()
+
+    def get(self, session: Session) -> DraftOccupancy:
+        with self.lock:
+            if self.index is None:
+                self.index = DraftOccupancy(version_rows(session, latest_version_id(session)),
+                                            session.exec(select(TimeSlot)).all(),
+                                            session.exec(select(Room)).all())
+            return self.index
+
+    def invalidate(self):
+        with self.lock:
+            self.index = None
+
+draft_occupancy = CachedDraftOccupancy()
+
+def invalidate_occupancy():
+    """
+    Call after a version is saved or published, or rooms, time slots or availability change.
+    """
+    published_occupancy.invalidate()
+    draft_occupancy.invalidate()
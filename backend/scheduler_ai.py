@@ -0,0 +1,204 @@
+import threading
+import time
+import numpy as np
+from typing import List, Dict
+from sqlmodel import Session
+from backend.models import Schedule
+from backend.timetable_algorithm import TimetableGeneticAlgorithm, GENE_DTYPE, SLOT, ROOM
+from backend.timetable_problem import HARD_CONSTRAINTS
+
+class TimetableSolver:
+    """
+    Common interface of the timetable engines behind /generate-timetable.
+    Every engine works on the same TimetableProblem encoding (and so the same HARD_CONSTRAINTS)
+    and returns the same Schedule rows via chromosome_to_schedule.
+    """
+    name = None
+
+    def solve(self) -> List[Schedule]:
+        raise NotImplementedError
+
+    def report(self) -> Dict:
+        raise NotImplementedError
+
+class GeneticSolver(TimetableSolver):
+    name = "ga"
+
+    def __init__(self, session: Session, **params):
+        self.optimizer = TimetableGeneticAlgorithm(session, **params)
+
+    def solve(self) -> List[Schedule]:
+        return self.optimizer.generate()
+
+    def report(self) -> Dict:
+        return {"engine": self.name, **self.optimizer.report()}
+
+class ConstraintSolver(TimetableSolver):
+    """
+    Exact engine: slot assignment as a CP-SAT model (OR-Tools).
+
+    One boolean per (allocation, time) allowed by the slot domain. Teacher and section constraints
+    allow at most one allocation per (entity, time); the room constraint becomes "per time, at most
+    as many allocations restricted to a set of rooms as that set has open rooms" (for every distinct room
+    domain), after which rooms are handed out per time, most constrained allocation first.
+    Teachers' availability preferences and late classes (both a fixed cost per allocation and time) are
+    the objective; teacher gaps, daily overload and repeated subjects are only scored (like in the GA)
+    on the solution, so with any of them weighted a solved model is reported "feasible", not "optimal".
+    Proves infeasibility instead of searching for 200 generations.
+    should_stop() is polled while the solver runs and cancels the search (stop_reason "cancelled");
+    there are no generations, so no progress is reported through on_generation.
+    """
+    name = "cp"
+
+    # Soft objectives scored on the solution but missing from the CP objective
+    UNMODELLED_SOFT = ("teacher_gaps", "section_daily_overload", "repeated_subject")
+
+    # Params that shape the problem (availability costs, soft objectives) rather than the GA search
+    PROBLEM_PARAMS = ("preference_weight", "soft_weights", "max_daily_classes", "late_periods")
+
+    # How often should_stop() is checked during the search
+    CANCEL_POLL_SECONDS = 0.2
+
+    def __init__(self, session: Session, max_seconds=60.0, workers=8, should_stop=None, on_generation=None, **params):
+        # The GA object only serves as the shared data loader / encoder / decoder here
+        self.model = TimetableGeneticAlgorithm(session, **{k: params[k] for k in self.PROBLEM_PARAMS if k in params})
+        self.max_seconds = max_seconds
+        self.workers = workers
+        self.should_stop = should_stop
+        self.stop_reason = None
+        self.best_score = None
+        self.hard_conflicts = None
+        self.soft_penalty = None
+        self.elapsed_seconds = 0.0
+
+    def solve(self) -> List[Schedule]:
+        try:
+            from ortools.sat.python import cp_model
+        except ImportError:
+            raise ValueError("The 'cp' engine needs OR-Tools (pip install ortools)")
+
+        started = time.monotonic()
+        p = self.model.problem
+        model = cp_model.CpModel()
+        x = [[model.NewBoolVar(f"x_{a}_{t}") for t in range(p.n_times)] for a in range(p.n_allocations)]
+
+        # Times reachable through each allocation's slot domain
+        time_domain = np.zeros((p.n_allocations, p.n_times), dtype=bool)
+        for slot, t in enumerate(p.slot_time_codes.tolist()):
+            time_domain[:, t] |= p.slot_domain[:, slot]
+        for a in range(p.n_allocations):
+            model.AddExactlyOne(x[a])
+            for t in np.flatnonzero(~time_domain[a]).tolist():
+                model.Add(x[a][t] == 0)
+
+        for constraint in HARD_CONSTRAINTS:
+            if constraint == "room":
+                # Rooms are chosen after the slots: only the number of classes per time is bounded
+                for group, sizes in zip(*p.room_groups()):
+                    members = np.flatnonzero(group).tolist()
+                    for t in range(p.n_times):
+                        model.Add(sum(x[a][t] for a in members) <= int(sizes[t]))
+                continue
+            entities = p.entity_codes(constraint)
+            for entity in range(p.n_entities(constraint)):
+                members = np.flatnonzero(entities == entity).tolist()
+                if len(members) < 2:
+                    continue
+                for t in range(p.n_times):
+                    model.AddAtMostOne(x[a][t] for a in members)
+
+        costs = p.teacher_penalty[p.teacher_codes] + p.soft_weights["late_classes"] * p.time_late[np.newaxis, :]
+        if costs.any():
+            model.Minimize(sum(int(costs[a, t]) * x[a][t] for a in range(p.n_allocations)
+                               for t in np.flatnonzero((costs[a] > 0) & time_domain[a]).tolist()))
+
+        solver = cp_model.CpSolver()
+        if self.max_seconds is not None:
+            solver.parameters.max_time_in_seconds = float(self.max_seconds)
+        solver.parameters.num_workers = self.workers
+        cancelled = threading.Event()
+        finished = threading.Event()
+
+        def watch():
+            while not finished.wait(self.CANCEL_POLL_SECONDS):
+                if self.should_stop():
+                    cancelled.set()
+                    solver.StopSearch()
+                    return
+
+        if self.should_stop:
+            threading.Thread(target=watch, daemon=True).start()
+        try:
+            status = solver.Solve(model)
+        finally:
+            finished.set()
+        self.elapsed_seconds = time.monotonic() - started
+
+        if cancelled.is_set():
+            self.stop_reason = "cancelled"
+            return []
+
+        if status == cp_model.INFEASIBLE:
+            self.stop_reason = "infeasible"
+            raise ValueError("No conflict-free timetable exists for the current allocations, rooms and time slots")
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            self.stop_reason = "time_limit"
+            raise ValueError(f"CP solver found no timetable within {self.max_seconds} seconds")
+
+        chromosome = self.decode([[solver.Value(v) for v in row] for row in x])
+        if chromosome is None:
+            self.stop_reason = "infeasible"
+            raise ValueError("CP solution could not be given rooms within the room domains")
+        # Without a linear cost any feasible model is optimal; with one a time limit may stop before the best.
+        # The remaining soft objectives are not in the model, so nothing is proven about them
+        if status != cp_model.OPTIMAL:
+            self.stop_reason = "time_limit"
+        elif any(p.soft_weights[name] for name in self.UNMODELLED_SOFT):
+            self.stop_reason = "feasible"
+        else:
+            self.stop_reason = "optimal"
+        self.best_score = int(self.model.engine.score(chromosome[np.newaxis])[0])
+        self.hard_conflicts = int(self.model.engine.hard_conflicts(chromosome[np.newaxis])[0])
+        self.soft_penalty = int(self.model.engine.soft_penalty(chromosome[np.newaxis])[0])
+        return self.model.chromosome_to_schedule(chromosome)
+
+    def decode(self, values) -> np.ndarray:
+        """
+        Solver values -> chromosome: first allowed slot of the chosen time, distinct rooms per time
+        (allocations with the fewest allowed rooms pick first). None if some allocation finds no room left.
+        """
+        p = self.model.problem
+        chromosome = np.empty((p.n_allocations, 2), dtype=GENE_DTYPE)
+        room_busy = p.room_blocked.copy()
+        order = np.argsort(p.room_name_domain.sum(axis=1), kind="stable")
+        for a in order.tolist():
+            t = values[a].index(1)
+            chromosome[a, SLOT] = np.flatnonzero(p.slot_domain[a] & (p.slot_time_codes == t))[0]
+            rooms = np.flatnonzero(p.room_domain[a] & ~room_busy[p.room_codes, t])
+            if len(rooms) == 0:
+                return None
+            chromosome[a, ROOM] = rooms[0]
+            room_busy[p.room_codes[rooms[0]], t] = True
+        return chromosome
+
+    def report(self) -> Dict:
+        return {
+            "engine": self.name,
+            "stop_reason": self.stop_reason,
+            "generations": 0,
+            "best_score": self.best_score,
+            "hard_conflicts": self.hard_conflicts,
+            "soft_penalty": self.soft_penalty,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "trace": [],
+        }
+
+SOLVERS = {
+    GeneticSolver.name: GeneticSolver,
+    ConstraintSolver.name: ConstraintSolver,
+}
+
+def create_solver(session: Session, engine="ga", **params) -> TimetableSolver:
+    if engine not in SOLVERS:
+        raise ValueError(f"Unknown engine '{engine}'. Choose one of: {', '.join(SOLVERS)}")
+    return SOLVERS[engine](session, **params)
@@ -1,147 +1,961 @@
-import random
+import os
+import json
+import time
+import hashlib
+import multiprocessing as mp
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Tuple
 from sqlmodel import Session, select
-from backend.models import Room, TimeSlot, Subject, CourseAllocation, Schedule, User
+from backend.models import Room, TimeSlot, Subject, CourseAllocation, Schedule, User, Availability
+from collections import Counter
+from backend.timetable_problem import TimetableProblem, room_domain
+from backend.fitness_engine import PopulationFitnessEngine, IncrementalFitness, FitnessCache
+from backend.timetable_store import version_rows, published_version_id, latest_version_id
+
+# Gene layout: chromosome[i] = [slot index, room index] for self.allocations[i]
+SLOT, ROOM = 0, 1
+GENE_DTYPE = np.int16
+
+def _evolve_island(problem, settings, population, generations, seed):
+    """
+    Worker entry point for the island model and decomposition (runs in a separate process).
+    Evolves one island / component (population None = a fresh one) for `generations` and returns
+    (population, scores, per-generation best trace, fitness cache report or None).
+    """
+    ga = TimetableGeneticAlgorithm(None, problem=problem, seed=seed, **settings)
+    if population is None:
+        population = ga.initialize_population()
+    population, scores, _, _ = ga.evolve(population, generations)
+    return population, scores, ga.trace, ga.cache_report()
 
 class TimetableGeneticAlgorithm:
-    def __init__(self, session: Session, population_size=100, generations=200): # Increased params
+    def __init__(self, session: Session, population_size=100, generations=200, fitness_engine="numpy", seed=None,
+                 islands=1, island_size=None, island_workers=None, migration_interval=10, migration_size=2,
+                 greedy_seed_ratio=0.2, max_seconds=None, stagnation_generations=None,
+                 on_generation=None, should_stop=None, base_chromosome=None, free_genes=None,
+                 local_search=None, local_search_steps=50, tabu_tenure=10, fitness_cache_size=10000,
+                 warm_start=False, warm_start_ratio=0.5, decompose=False, two_phase=False, preference_weight=10,
+                 soft_weights=None, max_daily_classes=6, late_periods=1,
+                 checkpoint_path=None, checkpoint_interval=10, resume=False,
+                 problem: TimetableProblem = None): # Increased params
         self.session = session
         self.population_size = population_size
+        if generations < 1:
+            raise ValueError("generations must be at least 1")
         self.generations = generations
-        
+        # "numpy" (batched) or "python" (calculate_fitness). Delta scoring (IncrementalFitness) is not a
+        # population engine: replaying every crossover child costs more than one batched pass, so it
+        # only drives single-gene moves in local_search and repair
+        if fitness_engine not in ("numpy", "python"):
+            raise ValueError(f"Unknown fitness engine '{fitness_engine}'. Choose one of: numpy, python")
+        # Island and component workers only get the TimetableProblem, not the rows calculate_fitness reads
+        if fitness_engine == "python" and (islands > 1 or decompose):
+            raise ValueError("The python fitness engine cannot run with islands or decompose")
+        self.fitness_engine = fitness_engine
+        self.mutation_rate = 0.2
+        self.rng = np.random.default_rng(seed)
+        # Share of the initial population built by the conflict-aware greedy constructor (rest stays random)
+        self.greedy_seed_ratio = greedy_seed_ratio
+
+        # Anytime stopping: wall-clock budget and "no improvement for X generations"
+        self.max_seconds = max_seconds
+        self.stagnation_generations = stagnation_generations
+
+        # Optional hooks for background jobs: on_generation(generation, best_score) after every
+        # generation, should_stop() -> True cancels the run (stop_reason "cancelled")
+        self.on_generation = on_generation
+        self.should_stop = should_stop
+
+        # LRU score cache for duplicate chromosomes (numpy/python engines; 0 disables it)
+        self.fitness_cache = FitnessCache(fitness_cache_size) if fitness_cache_size else None
+        self.cache_trace = [] # cache hit rate per generation
+
+        # Memetic refinement: tabu search over the conflicting genes of the elite chromosomes
+        # every generation ("elite") or of the final best only ("end")
+        if local_search not in (None, "elite", "end"):
+            raise ValueError(f"Unknown local search mode '{local_search}'. Choose one of: elite, end")
+        self.local_search_mode = local_search
+        self.local_search_steps = local_search_steps
+        self.tabu_tenure = tabu_tenure
+
+        # Pinned genes (incremental repair): every chromosome starts from base_chromosome and only
+        # the genes listed in free_genes are ever changed. free_genes=None means all genes are free.
+        self.base_chromosome = base_chromosome
+        self.free_genes = free_genes
+        self.changed_genes = None # genes that must be re-placed (greedy seeding keeps the other free genes at base)
+
+        # Warm start: seed warm_start_ratio of the population with the existing timetable and mutated copies of it
+        self.warm_start_ratio = warm_start_ratio
+        self.warm_start_chromosome = None
+        self.warm_start_matched = 0 # allocations found in the existing timetable
+        self.warm_start_changed = 0 # matched allocations the result moved away from their old (slot, room)
+
+        # Decomposition: solve connected components of the teacher/section/room graph in parallel
+        self.decompose = decompose
+        self.component_sizes = None
+
+        # Two-phase mode: the GA only evolves slots (room genes are left alone and the fitness counts
+        # classes over room capacity per time instead of room clashes); rooms are given to the final
+        # best per time by maximum bipartite matching (TimetableProblem.match_rooms)
+        self.two_phase = two_phase
+        self.unmatched_rooms = None
+        if two_phase and (fitness_engine != "numpy" or local_search):
+            raise ValueError("two_phase needs the numpy fitness engine and no local search")
+
+        # Checkpoints (single population runs): population, RNG state, generation and best so far are
+        # written to checkpoint_path every checkpoint_interval generations; resume=True continues from it
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.resume = resume
+        self.resumed_from = None # generation the run resumed at
+
+        # Run report (see report())
+        self.generations_run = 0
+        self.best_score = None
+        self.stop_reason = None
+        self.elapsed_seconds = 0.0
+        self.trace = [] # best score so far, per generation
+        # Best timetable's hard conflicts / soft penalty, and when the run first had a feasible
+        # (no hard conflicts) timetable; the score only reaches 1000 when the soft penalty is 0 too
+        self.hard_conflicts = None
+        self.soft_penalty = None
+        self.first_feasible = None
+
+        # Island model: K sub-populations evolved in parallel processes, swapping their best
+        # `migration_size` individuals every `migration_interval` generations.
+        # By default the population is split across the islands so total work stays the same.
+        self.islands = islands
+        self.island_size = island_size or max(population_size // max(islands, 1), 4)
+        self.island_workers = island_workers or islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+
+        if problem is not None:
+            # Island workers only get the integer encoding, no session / ORM objects
+            self.problem = problem
+            self.engine = PopulationFitnessEngine(self.problem, room_matching=two_phase)
+            return
+
         # Load Data
         self.allocations = session.exec(select(CourseAllocation)).all()
         self.rooms = session.exec(select(Room)).all()
         self.slots = session.exec(select(TimeSlot)).all()
-        
+
         # Mappings for quick access
         self.subjects = {s.id: s for s in session.exec(select(Subject)).all()}
         # Ensure we have data
         if not self.allocations or not self.rooms or not self.slots:
             raise ValueError("Insufficient data for generation")
+        if max(len(self.slots), len(self.rooms)) > np.iinfo(GENE_DTYPE).max:
+            raise ValueError("Too many time slots or rooms for the chromosome encoding")
+
+        # Candidate domains: rooms must fit the section (student count) and match the subject's room type
+        self.section_sizes = Counter(u.section for u in session.exec(select(User).where(User.role == "student")).all())
+        rooms_allowed = room_domain(self.allocations, self.rooms, self.subjects, self.section_sizes)
+        # Faculty / room availability, compiled into masks by TimetableProblem
+        self.availability = session.exec(select(Availability)).all()
+
+        # Integer encoding for the batched fitness engine
+        self.problem = TimetableProblem(self.allocations, self.slots, self.rooms, room_domain=rooms_allowed,
+                                        availability=self.availability, preference_weight=preference_weight,
+                                        soft_weights=soft_weights, max_daily_classes=max_daily_classes, late_periods=late_periods)
+        self.engine = PopulationFitnessEngine(self.problem, room_matching=two_phase)
+
+        # Fail before the run instead of after 200 generations
+        issues = self.domain_issues()
+        if issues:
+            raise ValueError("No conflict-free timetable is possible: " + "; ".join(issues))
+
+        if warm_start:
+            # The published timetable, or the latest draft if nothing is published yet
+            schedules = version_rows(session, published_version_id(session))
+            self.prepare_warm_start(schedules or version_rows(session, latest_version_id(session)))
+
+    def domain_issues(self) -> List[str]:
+        """
+        Cheap necessary conditions on the candidate domains, one message per violation:
+        allocations without any allowed room or slot, teachers/sections with more classes than
+        times they are available, and room groups (allocations whose rooms all lie in the same set) with
+        more classes than that set can host while open.
+        """
+        p = self.problem
+        issues = []
+        for gene in np.flatnonzero(~p.room_domain.any(axis=1)).tolist():
+            alloc = self.allocations[gene]
+            subject = self.subjects[alloc.subject_id]
+            issues.append(f"{subject.code} for section {alloc.section_id} "
+                          f"({self.section_sizes.get(alloc.section_id, 0)} students) has no "
+                          f"{subject.room_type} room available")
+        for gene in np.flatnonzero(~p.slot_domain.any(axis=1)).tolist():
+            alloc = self.allocations[gene]
+            issues.append(f"{self.subjects[alloc.subject_id].code} for section {alloc.section_id}: "
+                          f"teacher {alloc.teacher_id} is unavailable at every time slot")
+        if issues:
+            return issues
+
+        for constraint, labels, available in (("teacher", [a.teacher_id for a in self.allocations], (~p.teacher_blocked).sum(axis=1)),
+                                              ("section", [a.section_id for a in self.allocations], np.full(p.n_sections, p.n_times))):
+            codes = p.entity_codes(constraint)
+            load = np.bincount(codes, minlength=p.n_entities(constraint))
+            for entity in np.flatnonzero(load > available).tolist():
+                label = labels[int(np.flatnonzero(codes == entity)[0])]
+                issues.append(f"{constraint} {label} has {load[entity]} classes but is available for only {available[entity]} time slots")
+
+        # Distinct room-name sets; classes whose rooms all lie in a set must fit its names x times
+        names = p.room_name_domain
+        groups = np.unique(names, axis=0)
+        for group in groups:
+            inside = ~(names & ~group).any(axis=1)
+            places = int((group[:, np.newaxis] & ~p.room_blocked).sum())
+            if inside.sum() > places:
+                room_list = ", ".join(sorted({r.name for r, code in zip(self.rooms, p.room_codes) if group[code]}))
+                issues.append(f"{inside.sum()} classes can only use rooms [{room_list}], "
+                              f"which have {places} open (room, time) places")
+        return issues
 
     def generate(self) -> List[Schedule]:
-        population = self.initialize_population()
+        """
+        Anytime: always returns the best schedule found before the first stop condition
+        (perfect score, generation limit, max_seconds or stagnation). See report() for how it stopped.
+        """
+        started = time.monotonic()
+        components = []
+        if self.decompose and self.free_genes is None and self.warm_start_chromosome is None:
+            components = self.problem.components()
+        if self.free_genes is not None and len(self.free_genes) == 0:
+            # Repair with nothing to move
+            best_solution = self.base_chromosome.copy()
+            self.trace = []
+            self.generations_run = 0
+            self.stop_reason = "nothing_to_repair"
+        elif len(components) > 1:
+            checkpoint = self.load_checkpoint("components") if self.resume else None
+            best_solution = self.run_components(components, checkpoint)
+        elif self.islands > 1:
+            shape = (self.islands, self.island_size, self.problem.n_allocations, 2)
+            checkpoint = self.load_checkpoint("islands", shape) if self.resume else None
+            best_solution = self.run_islands(checkpoint)
+        else:
+            checkpoint = self.load_checkpoint() if self.resume else None
+            if checkpoint is not None:
+                _, _, best_solution, _ = self.evolve(checkpoint["population"], self.generations, checkpoint)
+            else:
+                _, _, best_solution, _ = self.evolve(self.initialize_population(), self.generations)
+        if self.checkpoint_path and self.stop_reason != "cancelled" and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path) # finished; a cancelled run keeps it for resuming
+        if self.local_search_mode and self.stop_reason not in ("optimal", "cancelled"):
+            # Longer pass on the final best
+            self.local_search(best_solution, self.local_search_steps * 10)
+            if self.engine.score(best_solution[np.newaxis])[0] >= 1000:
+                self.stop_reason = "optimal"
+        engine = self.engine
+        if self.two_phase:
+            self.assign_rooms(best_solution)
+            # Scored on the actual rooms, like every other mode
+            engine = PopulationFitnessEngine(self.problem)
+        self.best_score = int(engine.score(best_solution[np.newaxis])[0])
+        self.hard_conflicts = int(engine.hard_conflicts(best_solution[np.newaxis])[0])
+        self.soft_penalty = int(engine.soft_penalty(best_solution[np.newaxis])[0])
+        self.elapsed_seconds = time.monotonic() - started
+        if self.warm_start_chromosome is not None:
+            moved = (best_solution != self.warm_start_previous).any(axis=1) & self.warm_start_matched_genes
+            self.warm_start_changed = int(moved.sum())
+        return self.chromosome_to_schedule(best_solution)
+
+    def report(self) -> Dict:
+        return {
+            "stop_reason": self.stop_reason,
+            "generations": self.generations_run,
+            "best_score": self.best_score,
+            "hard_conflicts": self.hard_conflicts,
+            "soft_penalty": self.soft_penalty,
+            "first_feasible": self.first_feasible,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "trace": self.trace,
+            "cache": self.cache_report(),
+            "warm_start": self.warm_start_report(),
+            "components": self.component_sizes,
+            "unmatched_rooms": self.unmatched_rooms,
+            "resumed_from": self.resumed_from,
+        }
+
+    def warm_start_report(self):
+        if self.warm_start_chromosome is None:
+            return None
+        return {
+            "matched_allocations": self.warm_start_matched,
+            "changed_allocations": self.warm_start_changed,
+        }
+
+    def cache_report(self):
+        if self.fitness_cache is None:
+            return None
+        return {
+            "max_entries": self.fitness_cache.max_entries,
+            "hits": self.fitness_cache.hits,
+            "misses": self.fitness_cache.misses,
+            "hit_rate": round(self.fitness_cache.hit_rate, 4),
+            "trace": self.cache_trace,
+        }
+
+    def evolve(self, population, generations, checkpoint=None):
+        """
+        Runs the GA loop on `population`, or continues a run from a loaded checkpoint.
+        Returns (population, scores, best_solution, best_score) where scores belong to the returned population.
+        Sets generations_run, stop_reason and trace.
+        """
         best_solution = None
         best_score = -float('inf')
-        
-        for generation in range(self.generations):
-            scored_pop = []
-            for chromosome in population:
-                score = self.calculate_fitness(chromosome)
-                scored_pop.append((score, chromosome))
-            
-            scored_pop.sort(key=lambda x: x[0], reverse=True)
-            
-            current_best_score = scored_pop[0][0]
+        started = time.monotonic()
+        deadline = started + self.max_seconds if self.max_seconds is not None else None
+        stagnant = 0
+        start = 0
+        self.trace = []
+        self.cache_trace = []
+        if checkpoint is not None:
+            start = checkpoint["generation"]
+            best_solution = checkpoint["best_solution"]
+            best_score = checkpoint["best_score"]
+            stagnant = checkpoint["stagnant"]
+            self.trace = checkpoint["trace"]
+            self.first_feasible = checkpoint["first_feasible"]
+        self.generations_run = generations
+        self.stop_reason = "generation_limit"
+
+        scores = self.score_population(population)
+
+        for generation in range(start, generations):
+            if self.checkpoint_path and generation > start and generation % self.checkpoint_interval == 0:
+                self.save_checkpoint(population, generation, best_solution, best_score, stagnant)
+            if self.local_search_mode == "elite":
+                self.refine_elites(population, scores)
+            order = np.argsort(-scores, kind="stable")
+
+            current_best_score = int(scores[order[0]])
             if current_best_score > best_score:
                 best_score = current_best_score
-                best_solution = scored_pop[0][1]
-            
-            if generation % 10 == 0:
-                 print(f"Gen {generation}: Best Score {best_score}")
+                best_solution = population[order[0]].copy()
+                stagnant = 0
+                self.note_feasible(best_solution, generation, started)
+            else:
+                stagnant += 1
+            self.trace.append(best_score)
+            if self.fitness_cache:
+                self.cache_trace.append(round(self.fitness_cache.last_hit_rate, 4))
+            if self.on_generation:
+                self.on_generation(generation, best_score)
 
+            stop_reason = None
             if best_score >= 1000: # Perfect score
-                 print("Optimal solution found.")
-                 break
-            
-            # Elitism
-            new_pop = [scored_pop[0][1], scored_pop[1][1]]
-            
-            while len(new_pop) < self.population_size:
-                p1 = self.tournament_select(scored_pop)
-                p2 = self.tournament_select(scored_pop)
-                child = self.crossover(p1, p2)
-                self.mutate(child)
-                new_pop.append(child)
-                
+                stop_reason = "optimal"
+            elif self.should_stop and self.should_stop():
+                stop_reason = "cancelled"
+            elif self.stagnation_generations and stagnant >= self.stagnation_generations:
+                stop_reason = "stagnation"
+            elif deadline is not None and time.monotonic() >= deadline:
+                stop_reason = "time_limit"
+            if stop_reason:
+                self.stop_reason = stop_reason
+                self.generations_run = generation
+                break
+
+            # Elitism (copied into the new buffer, so later mutations never touch them)
+            new_pop = np.empty_like(population)
+            new_pop[0] = population[order[0]]
+            new_pop[1] = population[order[1]]
+
+            for i in range(2, len(population)):
+                a = self.tournament_select(scores)
+                b = self.tournament_select(scores)
+                new_pop[i] = self.crossover(population[a], population[b])
+                self.mutate(new_pop[i])
+
             population = new_pop
-            
-        return self.chromosome_to_schedule(best_solution)
+            scores = self.score_population(population)
+
+        # The last bred generation may hold something better than what was recorded
+        top = int(np.argmax(scores))
+        if scores[top] > best_score:
+            best_score = int(scores[top])
+            best_solution = population[top].copy()
+            self.trace[-1] = best_score
 
-    def initialize_population(self):
+        return population, scores, best_solution, best_score
+
+    def note_feasible(self, chromosome, generation, started):
+        """
+        Records the first generation (and seconds into the run) whose best timetable has no hard conflicts.
+        """
+        if self.first_feasible is None and self.engine.hard_conflicts(chromosome[np.newaxis])[0] == 0:
+            self.first_feasible = {"generation": generation, "seconds": round(time.monotonic() - started, 3)}
+
+    def problem_key(self) -> str:
+        """
+        Digest of the encoded problem, so a checkpoint is only resumed on the inputs it was written for.
         """
-        A Chromosome is a list of tuples: [(Allocation, Slot, Room), ...]
+        p = self.problem
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (p.teacher_codes, p.section_codes, p.slot_time_codes, p.room_codes,
+                      p.slot_domain, p.room_domain, p.room_blocked, p.teacher_penalty):
+            digest.update(str(array.shape).encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def save_checkpoint(self, population, generation, best_solution, best_score, stagnant, mode="single",
+                        component_traces=None):
+        """
+        Writes the loop state at the start of `generation` as one compressed .npz (replaced atomically,
+        so a crash while writing keeps the previous checkpoint). mode is "single", "islands" (population
+        holds every island) or "components" (the component populations put back at their genes).
+        """
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = self.checkpoint_path + ".tmp"
+        with open(partial, "wb") as f:
+            np.savez_compressed(
+                f,
+                population=population,
+                generation=generation,
+                best_solution=best_solution,
+                best_score=best_score,
+                stagnant=stagnant,
+                trace=np.array(self.trace, dtype=np.int64),
+                first_feasible=json.dumps(self.first_feasible),
+                rng_state=json.dumps(self.rng.bit_generator.state),
+                problem_key=self.problem_key(),
+                mode=mode,
+                **({"component_traces": component_traces} if component_traces is not None else {}),
+            )
+        os.replace(partial, self.checkpoint_path)
+
+    def load_checkpoint(self, mode="single", shape=None):
+        """
+        The checkpoint at checkpoint_path as a dict (and the RNG restored), or None if there is none
+        or it belongs to other inputs, another mode or another population shape
+        (default: (population_size, allocations, 2)).
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        shape = shape or (self.population_size, self.problem.n_allocations, 2)
+        with np.load(self.checkpoint_path) as data:
+            saved_mode = str(data["mode"]) if "mode" in data else "single"
+            if (str(data["problem_key"]) != self.problem_key() or saved_mode != mode
+                    or data["population"].shape != tuple(shape)):
+                return None
+            checkpoint = {
+                "population": data["population"],
+                "generation": int(data["generation"]),
+                "best_solution": data["best_solution"],
+                "best_score": int(data["best_score"]),
+                "stagnant": int(data["stagnant"]),
+                "trace": data["trace"].tolist(),
+                # Missing in checkpoints written before it was saved
+                "first_feasible": json.loads(str(data["first_feasible"])) if "first_feasible" in data else None,
+                "component_traces": data["component_traces"].tolist() if "component_traces" in data else None,
+            }
+            self.rng.bit_generator.state = json.loads(str(data["rng_state"]))
+        self.resumed_from = checkpoint["generation"]
+        return checkpoint
+
+    def run_islands(self, checkpoint=None):
+        """
+        Island model: evolves self.islands sub-populations in a process pool and migrates
+        the best individuals of each island to the next one (ring) every migration_interval generations.
+        Checkpoints are written between epochs; `checkpoint` (from load_checkpoint) continues one.
+        Returns the global best chromosome.
+        """
+        started = time.monotonic()
+        settings = {
+            "population_size": self.island_size,
+            "fitness_engine": self.fitness_engine,
+            "stagnation_generations": self.stagnation_generations,
+            "base_chromosome": self.base_chromosome,
+            "free_genes": self.free_genes,
+            "local_search": "elite" if self.local_search_mode == "elite" else None,
+            "local_search_steps": self.local_search_steps,
+            "tabu_tenure": self.tabu_tenure,
+            "fitness_cache_size": self.fitness_cache.max_entries if self.fitness_cache else 0,
+            "two_phase": self.two_phase,
+        }
+        done = 0
+        best_solution = None
+        best_score = -float('inf')
+        stagnant = 0
+        self.trace = []
+        self.cache_trace = []
+        self.stop_reason = "generation_limit"
+        if checkpoint is not None:
+            islands = list(checkpoint["population"])
+            done = checkpoint["generation"]
+            best_solution = checkpoint["best_solution"]
+            best_score = checkpoint["best_score"]
+            stagnant = checkpoint["stagnant"]
+            self.trace = checkpoint["trace"]
+            self.first_feasible = checkpoint["first_feasible"]
+        else:
+            islands = [self.initialize_population(self.island_size) for _ in range(self.islands)]
+        saved = done
+
+        # Spawned like the generation jobs: a forked worker would inherit the server's threads and DB connections
+        with ProcessPoolExecutor(max_workers=self.island_workers, mp_context=mp.get_context("spawn")) as pool:
+            while done < self.generations:
+                if self.checkpoint_path and done - saved >= self.checkpoint_interval:
+                    self.save_checkpoint(np.stack(islands), done, best_solution, best_score, stagnant, mode="islands")
+                    saved = done
+                epoch = min(self.migration_interval, self.generations - done)
+                if self.max_seconds is not None:
+                    settings["max_seconds"] = max(self.max_seconds - (time.monotonic() - started), 0)
+                futures = [
+                    pool.submit(_evolve_island, self.problem, settings, population, epoch,
+                                int(self.rng.integers(2**32)))
+                    for population in islands
+                ]
+                results = [f.result() for f in futures]
+
+                previous_best = best_score
+                islands = [population for population, _, _, _ in results]
+                for population, scores, trace, _ in results:
+                    top = int(np.argmax(scores))
+                    if scores[top] > best_score:
+                        best_score = int(scores[top])
+                        best_solution = population[top].copy()
+                        self.note_feasible(best_solution, done + len(trace) - 1, started)
+
+                # Global per-generation trace: best over all islands, carried forward
+                traces = [trace for _, _, trace, _ in results]
+                if self.fitness_cache:
+                    self.merge_cache_reports([cache for _, _, _, cache in results])
+                for g in range(max(len(trace) for trace in traces)):
+                    island_best = max(trace[min(g, len(trace) - 1)] for trace in traces)
+                    self.trace.append(max(island_best, self.trace[-1]) if self.trace else island_best)
+                    if self.on_generation:
+                        self.on_generation(len(self.trace) - 1, self.trace[-1])
+                done = len(self.trace)
+                self.generations_run = done
+                stagnant = 0 if best_score > previous_best else stagnant + epoch
+
+                if best_score >= 1000: # Perfect score
+                    self.stop_reason = "optimal"
+                    self.generations_run = self.trace.index(best_score)
+                    break
+                if self.should_stop and self.should_stop():
+                    self.stop_reason = "cancelled"
+                    break
+                if self.stagnation_generations and stagnant >= self.stagnation_generations:
+                    self.stop_reason = "stagnation"
+                    break
+                if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+                    self.stop_reason = "time_limit"
+                    break
+
+                self.migrate([(population, scores) for population, scores, _, _ in results])
+
+        return best_solution
+
+    def merge_cache_reports(self, reports):
+        """
+        Adds the island caches' counters to ours; the cache trace gets the mean hit rate over islands.
+        """
+        self.fitness_cache.hits += sum(report["hits"] for report in reports)
+        self.fitness_cache.misses += sum(report["misses"] for report in reports)
+        for g in range(max(len(report["trace"]) for report in reports)):
+            rates = [report["trace"][g] for report in reports if g < len(report["trace"])]
+            self.cache_trace.append(round(sum(rates) / len(rates), 4))
+
+    def run_components(self, components: List[np.ndarray], checkpoint=None):
         """
-        population = []
-        for _ in range(self.population_size):
-            chromosome = []
-            for alloc in self.allocations:
-                # Random assignment
-                slot = random.choice(self.slots)
-                room = random.choice(self.rooms)
-                chromosome.append({'alloc': alloc, 'slot': slot, 'room': room})
-            population.append(chromosome)
+        Solves each connected component as its own GA in a process pool and merges the genes back.
+        Components share no teacher, section or room, so the merged conflicts are the sum of theirs and
+        the search grows with the largest component instead of the whole institution.
+        Like run_islands the components run in epochs of migration_interval generations (without
+        migration), so cancel, max_seconds and progress are handled between epochs; a component that
+        reaches a perfect score is not run again. Checkpoints are written between epochs; `checkpoint`
+        (from load_checkpoint) continues one.
+        The merged trace is the score of the combined best-so-far per generation.
+        """
+        started = time.monotonic()
+        self.component_sizes = [len(genes) for genes in components]
+        settings = {
+            "population_size": self.population_size,
+            "fitness_engine": self.fitness_engine,
+            "greedy_seed_ratio": self.greedy_seed_ratio,
+            "stagnation_generations": self.stagnation_generations,
+            "local_search": "elite" if self.local_search_mode == "elite" else None,
+            "local_search_steps": self.local_search_steps,
+            "tabu_tenure": self.tabu_tenure,
+            "fitness_cache_size": self.fitness_cache.max_entries if self.fitness_cache else 0,
+            "two_phase": self.two_phase,
+        }
+        problems = [self.problem.subset(genes) for genes in components]
+        populations = [None] * len(components)
+        traces = [[] for _ in components] # per component best-so-far, padded to the merged trace length
+        best_solution = np.empty((self.problem.n_allocations, 2), dtype=GENE_DTYPE)
+        best_score = -float('inf')
+        stagnant = 0
+        done = 0
+        self.trace = []
+        self.cache_trace = []
+        self.stop_reason = "generation_limit"
+        if checkpoint is not None:
+            populations = [checkpoint["population"][:, genes] for genes in components]
+            traces = checkpoint["component_traces"]
+            best_solution = checkpoint["best_solution"].copy()
+            best_score = checkpoint["best_score"]
+            stagnant = checkpoint["stagnant"]
+            done = checkpoint["generation"]
+            self.trace = checkpoint["trace"]
+            self.first_feasible = checkpoint["first_feasible"]
+        saved = done
+
+        with ProcessPoolExecutor(max_workers=self.island_workers if self.islands > 1 else None,
+                                 mp_context=mp.get_context("spawn")) as pool:
+            while done < self.generations:
+                if self.checkpoint_path and done - saved >= self.checkpoint_interval:
+                    population = np.empty((self.population_size, self.problem.n_allocations, 2), dtype=GENE_DTYPE)
+                    for genes, component_population in zip(components, populations):
+                        population[:, genes] = component_population
+                    self.save_checkpoint(population, done, best_solution, best_score, stagnant, mode="components",
+                                         component_traces=np.array(traces, dtype=np.int64))
+                    saved = done
+                epoch = min(self.migration_interval, self.generations - done)
+                if self.max_seconds is not None:
+                    # Every component of the wave gets what is left of the budget, not a fresh one
+                    settings["max_seconds"] = max(self.max_seconds - (time.monotonic() - started), 0)
+                active = [c for c, trace in enumerate(traces) if not trace or trace[-1] < 1000]
+                futures = {c: pool.submit(_evolve_island, problems[c], settings, populations[c], epoch,
+                                          int(self.rng.integers(2**32)))
+                           for c in active}
+                results = {c: f.result() for c, f in futures.items()}
+
+                for c, (population, scores, trace, _) in results.items():
+                    populations[c] = population
+                    top = int(np.argmax(scores))
+                    if not traces[c] or scores[top] > traces[c][-1]:
+                        best_solution[components[c]] = population[top]
+                    for score in trace:
+                        traces[c].append(max(score, traces[c][-1]) if traces[c] else score)
+                if self.fitness_cache:
+                    self.merge_cache_reports([cache for _, _, _, cache in results.values()])
+
+                # Merged trace: penalties add up, components that stopped early keep their last value
+                length = max(len(trace) for trace in traces)
+                for trace in traces:
+                    trace.extend([trace[-1]] * (length - len(trace)))
+                for g in range(done, length):
+                    self.trace.append(1000 - sum(1000 - trace[g] for trace in traces))
+                    if self.on_generation:
+                        self.on_generation(g, self.trace[-1])
+                done = length
+                self.generations_run = done
+                if self.trace[-1] > best_score:
+                    best_score = self.trace[-1]
+                    stagnant = 0
+                    self.note_feasible(best_solution, done - 1, started)
+                else:
+                    stagnant += epoch
+
+                if best_score >= 1000: # Every component perfect
+                    self.stop_reason = "optimal"
+                    self.generations_run = self.trace.index(best_score)
+                    break
+                if self.should_stop and self.should_stop():
+                    self.stop_reason = "cancelled"
+                    break
+                if self.stagnation_generations and stagnant >= self.stagnation_generations:
+                    self.stop_reason = "stagnation"
+                    break
+                if self.max_seconds is not None and time.monotonic() - started >= self.max_seconds:
+                    self.stop_reason = "time_limit"
+                    break
+
+        return best_solution
+
+    def migrate(self, results):
+        """
+        Ring migration: the best individuals of island k replace the worst of island k+1 (in place).
+        """
+        k = min(self.migration_size, self.island_size - 1)
+        migrants = [population[np.argsort(-scores, kind="stable")[:k]].copy() for population, scores in results]
+        for i, (population, scores) in enumerate(results):
+            worst = np.argsort(scores, kind="stable")[:k]
+            population[worst] = migrants[i - 1]
+
+    def initialize_population(self, size=None) -> np.ndarray:
+        """
+        The population is one int16 array of shape (population, allocations, 2).
+        A Chromosome is a row of it: [[slot index, room index], ...] aligned with self.allocations.
+        """
+        shape = (size or self.population_size, self.problem.n_allocations)
+        population = np.empty(shape + (2,), dtype=GENE_DTYPE)
+        # Random assignment within each allocation's candidate domain
+        population[..., SLOT], population[..., ROOM] = self.problem.sample(self.rng, np.broadcast_to(np.arange(shape[1]), shape))
+        warm = 0
+        if self.warm_start_chromosome is not None:
+            # The existing timetable itself plus copies with a few genes re-drawn
+            warm = max(int(round(len(population) * self.warm_start_ratio)), 1)
+            n_changes = max(shape[1] // 50, 1)
+            population[:warm] = self.warm_start_chromosome
+            for i in range(1, warm):
+                genes = self.rng.choice(shape[1], size=n_changes, replace=False)
+                population[i, genes, SLOT], population[i, genes, ROOM] = self.problem.sample(self.rng, genes)
+        if self.free_genes is not None:
+            pinned = np.ones(self.problem.n_allocations, dtype=bool)
+            pinned[self.free_genes] = False
+            population[:, pinned] = self.base_chromosome[pinned]
+
+        # Greedy seeding for part of the population (the random rest keeps diversity)
+        for i in range(warm, min(warm + int(round(len(population) * self.greedy_seed_ratio)), len(population))):
+            population[i] = self.greedy_chromosome()
         return population
 
+    def greedy_chromosome(self) -> np.ndarray:
+        """
+        Conflict-aware constructor: places allocations by constraint degree (busiest teacher or
+        section first) into the first (slot, room) of their domain that is free in the occupancy indexes.
+        Slot and room orders are shuffled per call so repeated calls give different chromosomes.
+        Allocations with no free (slot, room) keep a random one. Pinned genes are kept and
+        pre-marked as busy.
+        """
+        p = self.problem
+        if self.changed_genes is not None:
+            movable = np.asarray(self.changed_genes)
+        elif self.free_genes is not None:
+            movable = np.asarray(self.free_genes)
+        else:
+            movable = np.arange(p.n_allocations)
+        teacher_load = np.bincount(p.teacher_codes, minlength=p.n_teachers)
+        section_load = np.bincount(p.section_codes, minlength=p.n_sections)
+        degree = np.maximum(teacher_load[p.teacher_codes], section_load[p.section_codes])
+
+        # Shuffle first so ties are broken randomly, then stable sort by degree (descending)
+        shuffled = self.rng.permutation(movable)
+        order = shuffled[np.argsort(-degree[shuffled], kind="stable")]
+
+        teacher_busy = np.zeros((p.n_teachers, p.n_times), dtype=bool)
+        section_busy = np.zeros((p.n_sections, p.n_times), dtype=bool)
+        room_busy = p.room_blocked.copy() # closed rooms are never free
+
+        slot_order = self.rng.permutation(p.n_slots)
+        room_order = self.rng.permutation(p.n_rooms)
+        slot_times = p.slot_time_codes[slot_order]
+        room_names = p.room_codes[room_order]
+
+        chromosome = np.empty((p.n_allocations, 2), dtype=GENE_DTYPE)
+        if self.base_chromosome is not None:
+            chromosome[:] = self.base_chromosome
+        chromosome[movable, SLOT], chromosome[movable, ROOM] = p.sample(self.rng, movable)
+
+        if len(movable) < p.n_allocations:
+            pinned = np.ones(p.n_allocations, dtype=bool)
+            pinned[movable] = False
+            times = p.slot_time_codes[chromosome[pinned, SLOT]]
+            teacher_busy[p.teacher_codes[pinned], times] = True
+            section_busy[p.section_codes[pinned], times] = True
+            room_busy[p.room_codes[chromosome[pinned, ROOM]], times] = True
+
+        for gene in order.tolist():
+            teacher = p.teacher_codes[gene]
+            section = p.section_codes[gene]
+            allowed_rooms = p.room_domain[gene, room_order]
+            free = (p.slot_domain[gene, slot_order]
+                    & ~teacher_busy[teacher, slot_times]
+                    & ~section_busy[section, slot_times]
+                    & (~room_busy[room_names[allowed_rooms]][:, slot_times]).any(axis=0))
+            candidates = np.flatnonzero(free)
+            if len(candidates) == 0:
+                continue
+            time = slot_times[candidates[0]]
+            room = np.flatnonzero(allowed_rooms & ~room_busy[room_names, time])[0]
+
+            chromosome[gene, SLOT] = slot_order[candidates[0]]
+            chromosome[gene, ROOM] = room_order[room]
+            teacher_busy[teacher, time] = True
+            section_busy[section, time] = True
+            room_busy[room_names[room], time] = True
+
+        return chromosome
+
+    def assign_rooms(self, chromosome):
+        """
+        Second phase: rooms by per-time bipartite matching for the evolved slots (in place).
+        Pinned genes keep their rooms; genes left without a room keep a random one from their domain
+        (and so show up as room conflicts in the final score).
+        """
+        fixed = None
+        if self.free_genes is not None:
+            fixed = np.ones(self.problem.n_allocations, dtype=bool)
+            fixed[self.free_genes] = False
+        rooms = self.problem.match_rooms(chromosome[:, SLOT], chromosome[:, ROOM], fixed)
+        unmatched = np.flatnonzero(rooms < 0)
+        rooms[unmatched] = self.problem.sample(self.rng, unmatched)[1]
+        chromosome[:, ROOM] = rooms
+        self.unmatched_rooms = len(unmatched)
+
+    def score_population(self, population: np.ndarray) -> np.ndarray:
+        if self.fitness_cache:
+            return self.fitness_cache.score(population, self.score_batch)
+        return self.score_batch(population)
+
+    def score_batch(self, population: np.ndarray) -> np.ndarray:
+        if self.fitness_engine == "python":
+            return np.array([self.calculate_fitness(chromosome) for chromosome in population])
+        return self.engine.score(population)
+
     def calculate_fitness(self, chromosome):
         score = 1000
-        
+
         # Helper maps for conflict check
         teacher_busy = set() # (teacher_id, day, time)
         room_busy = set()    # (room_name, day, time)
         section_busy = set() # (section_id, day, time)
-        
-        for gene in chromosome:
-            alloc = gene['alloc']
-            slot = gene['slot']
-            room = gene['room']
-            
+
+        p = self.problem
+        weights = p.soft_weights
+        teacher_periods = {} # (teacher_id, day) -> periods taught
+        section_load = Counter() # (section_id, day) -> classes
+        course_load = Counter()  # (section_id, subject_id, day) -> classes
+        for gene, (alloc, (slot_idx, room_idx)) in enumerate(zip(self.allocations, chromosome.tolist())):
+            slot = self.slots[slot_idx]
+            room = self.rooms[room_idx]
+            time = p.slot_time_codes[slot_idx]
+
             # HARD CONSTRAINTS
-            
+
             # 1. Teacher Conflict
             t_key = (alloc.teacher_id, slot.day_of_week, slot.start_time)
             if t_key in teacher_busy:
                 score -= 5000 # Massive penalty
             else:
                 teacher_busy.add(t_key)
-                
+
             # 2. Room Conflict
             r_key = (room.name, slot.day_of_week, slot.start_time)
             if r_key in room_busy:
                 score -= 5000
             else:
                 room_busy.add(r_key)
-                
+
             # 3. Section Conflict
             s_key = (alloc.section_id, slot.day_of_week, slot.start_time)
             if s_key in section_busy:
                 score -= 5000
             else:
                 section_busy.add(s_key)
-            
-            # SOFT CONSTRAINTS (+ points)
-            # - Preferred rooms?
-            # - Subject distribution?
-            
+
+            # 4. Room closed at that time (availability)
+            if p.room_blocked[p.room_codes[room_idx], time]:
+                score -= 5000
+
+            # SOFT CONSTRAINTS
+            # - Teacher availability preferences (preferred / avoided times)
+            score -= int(p.teacher_penalty[p.teacher_codes[gene], time])
+            # - Late classes
+            if p.time_late[time]:
+                score -= weights["late_classes"]
+            teacher_periods.setdefault((alloc.teacher_id, slot.day_of_week), set()).add(int(p.time_period[time]))
+            section_load[(alloc.section_id, slot.day_of_week)] += 1
+            course_load[(alloc.section_id, alloc.subject_id, slot.day_of_week)] += 1
+
+        # - Teacher idle periods between classes, section overload per day, same subject twice a day
+        for periods in teacher_periods.values():
+            score -= weights["teacher_gaps"] * (max(periods) - min(periods) + 1 - len(periods))
+        for classes in section_load.values():
+            score -= weights["section_daily_overload"] * max(classes - p.max_daily_classes, 0)
+        for classes in course_load.values():
+            score -= weights["repeated_subject"] * max(classes - 1, 0)
         return score
 
-    def tournament_select(self, scored_pop):
-        # Pick 3 random, return best
-        contestants = random.sample(scored_pop, 3)
-        contestants.sort(key=lambda x: x[0], reverse=True)
-        return contestants[0][1]
+    def refine_elites(self, population, scores, elites=2):
+        """
+        Runs local search on the best `elites` chromosomes in place and updates their scores.
+        """
+        for idx in np.argsort(-scores, kind="stable")[:elites]:
+            if scores[idx] >= 1000:
+                continue
+            self.local_search(population[idx], self.local_search_steps)
+            scores[idx] = self.engine.score(population[idx][np.newaxis])[0]
+
+    def local_search(self, chromosome, steps):
+        """
+        Tabu search over conflicting genes only (in place). Each step lifts one conflicting gene
+        and puts it at the (slot, room) adding the fewest conflicts according to the occupancy
+        tables; moving a gene back to a slot it just left is tabu for tabu_tenure steps unless
+        it beats the best chromosome seen. The best chromosome seen is written back.
+        Returns its number of hard conflicts.
+        """
+        state = IncrementalFitness(self.problem, chromosome)
+        best = chromosome.copy()
+        best_conflicts = state.conflicts
+        tabu = {} # gene -> {slot: last step it is tabu}
+        movable = None
+        if self.free_genes is not None:
+            movable = np.zeros(self.problem.n_allocations, dtype=bool)
+            movable[self.free_genes] = True
+
+        for step in range(steps):
+            if state.conflicts == 0:
+                break
+            candidates = state.conflicting_genes(chromosome)
+            if movable is not None:
+                candidates = candidates[movable[candidates]]
+            if len(candidates) == 0:
+                break
+            gene = int(self.rng.choice(candidates))
+            old_slot = int(chromosome[gene, SLOT])
+
+            state.lift(chromosome, gene)
+            costs = state.placement_costs(gene).astype(np.float64)
+            # Random tie-breaking among equally good moves, never outside the gene's domain
+            costs += self.rng.random(costs.shape) * 0.5
+            costs[~self.problem.room_domain[gene], :] = np.inf
+            costs[:, ~self.problem.slot_domain[gene]] = np.inf
+            for slot, until in tabu.get(gene, {}).items():
+                if until >= step and state.conflicts + np.floor(costs[:, slot].min()) >= best_conflicts:
+                    costs[:, slot] = np.inf
+            room, slot = np.unravel_index(int(np.argmin(costs)), costs.shape)
+            state.place(chromosome, gene, int(slot), int(room))
+            tabu.setdefault(gene, {})[old_slot] = step + self.tabu_tenure
+
+            if state.conflicts < best_conflicts:
+                best_conflicts = state.conflicts
+                best[:] = chromosome
+
+        chromosome[:] = best
+        return best_conflicts
+
+    def tournament_select(self, scores):
+        # Pick 3 random, return index of the best
+        contestants = self.rng.choice(len(scores), size=3, replace=False)
+        return contestants[np.argmax(scores[contestants])]
 
     def crossover(self, p1, p2):
-        # Single point crossover
-        point = random.randint(1, len(p1) - 1)
-        child = p1[:point] + p2[point:]
-        return child
+        # Single point crossover (always returns a fresh buffer)
+        if len(p1) < 2:
+            return p1.copy()
+        point = self.rng.integers(1, len(p1))
+        return np.concatenate((p1[:point], p2[point:]))
 
     def mutate(self, chromosome):
-        if random.random() < 0.2: # 20% mutation chance
-            idx = random.randint(0, len(chromosome) - 1)
-            chromosome[idx]['slot'] = random.choice(self.slots)
-            chromosome[idx]['room'] = random.choice(self.rooms)
+        if self.rng.random() < self.mutation_rate: # 20% mutation chance
+            if self.free_genes is None:
+                idx = self.rng.integers(0, len(chromosome))
+            else:
+                idx = self.free_genes[self.rng.integers(0, len(self.free_genes))]
+            slot, room = self.problem.sample(self.rng, idx)
+            chromosome[idx, SLOT] = slot
+            if not self.two_phase: # rooms come from the matching in two-phase mode
+                chromosome[idx, ROOM] = room
 
     def chromosome_to_schedule(self, chromosome):
+        # Only place where indices are resolved back to ORM objects
         schedules = []
-        for gene in chromosome:
-            alloc = gene['alloc']
-            slot = gene['slot']
-            room = gene['room']
+        for alloc, (slot_idx, room_idx) in zip(self.allocations, chromosome.tolist()):
+            slot = self.slots[slot_idx]
+            room = self.rooms[room_idx]
             subject = self.subjects[alloc.subject_id]
-            
+
             schedules.append(Schedule(
                 course_id=subject.code,
                 section=alloc.section_id,
@@ -153,3 +967,98 @@ class TimetableGeneticAlgorithm:
                 room=room.name
             ))
         return schedules
+
+    def encode_schedule(self, schedules: List[Schedule]):
+        """
+        Maps existing Schedule rows back onto allocations (by subject code, section and teacher).
+        Returns (chromosome, rows, orphans):
+        - chromosome: genes of matched allocations, random genes for the rest
+        - rows: the matched Schedule row per allocation (None for allocations without one)
+        - orphans: rows that no allocation claimed (their allocation was removed)
+        """
+        slot_lookup = {}
+        for i, slot in enumerate(self.slots):
+            slot_lookup.setdefault((slot.day_of_week, slot.start_time), i)
+        room_lookup = {}
+        for i, room in enumerate(self.rooms):
+            room_lookup.setdefault(room.name, i)
+
+        by_key = {}
+        for row in schedules:
+            by_key.setdefault((row.course_id, row.section, row.faculty_id), []).append(row)
+
+        chromosome = np.empty((len(self.allocations), 2), dtype=GENE_DTYPE)
+        chromosome[:, SLOT], chromosome[:, ROOM] = self.problem.sample(self.rng, np.arange(len(self.allocations)))
+        rows = [None] * len(self.allocations)
+
+        for gene, alloc in enumerate(self.allocations):
+            key = (self.subjects[alloc.subject_id].code, alloc.section_id, alloc.teacher_id)
+            candidates = by_key.get(key)
+            if not candidates:
+                continue
+            row = candidates.pop()
+            rows[gene] = row
+            slot_idx = slot_lookup.get((row.day_of_week, row.start_time))
+            room_idx = room_lookup.get(row.room)
+            # If its slot or room no longer exists the row is kept but the gene stays random
+            if slot_idx is not None and room_idx is not None:
+                chromosome[gene] = (slot_idx, room_idx)
+
+        orphans = [row for remaining in by_key.values() for row in remaining]
+        return chromosome, rows, orphans
+
+    def prepare_warm_start(self, schedules: List[Schedule]):
+        """
+        Encodes the existing timetable as the warm start chromosome. Allocations without a usable row
+        (new, or whose slot/room left their domain) get random genes, then a tabu pass over the
+        conflicting genes only fits them in while the rest of the timetable stays where it was.
+        """
+        p = self.problem
+        chromosome, rows, _ = self.encode_schedule(schedules)
+        previous = chromosome.copy()
+        genes = np.arange(p.n_allocations)
+        outside = ~p.room_domain[genes, chromosome[:, ROOM]] | ~p.slot_domain[genes, chromosome[:, SLOT]]
+        chromosome[outside, SLOT], chromosome[outside, ROOM] = p.sample(self.rng, genes[outside])
+        self.local_search(chromosome, self.local_search_steps * 10)
+        self.warm_start_chromosome = chromosome
+        self.warm_start_previous = previous
+        self.warm_start_matched_genes = np.array([row is not None for row in rows])
+        self.warm_start_matched = int(self.warm_start_matched_genes.sum())
+
+    def prepare_repair(self, schedules: List[Schedule], neighbourhood_size=10):
+        """
+        Incremental repair: pins every existing, conflict-free entry and frees only
+        new allocations, entries whose slot/room disappeared or left their domain, entries in conflict, and a
+        small random neighbourhood sharing a teacher or section with them.
+        Returns (rows, orphans) from encode_schedule.
+        """
+        p = self.problem
+        chromosome, rows, orphans = self.encode_schedule(schedules)
+
+        free = np.array([row is None for row in rows])
+        # Rows pointing at a slot/room that no longer exists
+        slot_keys = {(s.day_of_week, s.start_time) for s in self.slots}
+        room_names = {r.name for r in self.rooms}
+        for gene, row in enumerate(rows):
+            if row is not None and ((row.day_of_week, row.start_time) not in slot_keys or row.room not in room_names):
+                free[gene] = True
+
+        # Rows whose room or slot is no longer in the allocation's domain (e.g. section grew)
+        genes = np.arange(p.n_allocations)
+        free |= ~p.room_domain[genes, chromosome[:, ROOM]] | ~p.slot_domain[genes, chromosome[:, SLOT]]
+
+        # Genes involved in a conflict among the kept entries (clashes or a room closed since)
+        free[IncrementalFitness(p, chromosome).conflicting_genes(chromosome)] = True
+        self.changed_genes = np.flatnonzero(free)
+
+        # Neighbourhood: a few genes sharing a teacher or section with the freed ones
+        if free.any() and neighbourhood_size:
+            related = (np.isin(p.teacher_codes, p.teacher_codes[free])
+                       | np.isin(p.section_codes, p.section_codes[free])) & ~free
+            candidates = np.flatnonzero(related)
+            picked = self.rng.choice(candidates, size=min(neighbourhood_size, len(candidates)), replace=False)
+            free[picked] = True
+
+        self.base_chromosome = chromosome
+        self.free_genes = np.flatnonzero(free)
+        return rows, orphans
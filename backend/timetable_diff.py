@@ -0,0 +1,92 @@
+from typing import Dict, List
+from sqlmodel import Session
+from backend.models import Schedule, Notification
+
+def _entry_key(row: Schedule):
+    return (row.section, row.course_id, row.day_of_week, row.start_time)
+
+def _placement(row: Schedule) -> Dict:
+    return {"day_of_week": row.day_of_week, "start_time": row.start_time, "end_time": row.end_time,
+            "room": row.room, "faculty_id": row.faculty_id}
+
+def diff_versions(old_rows: List[Schedule], new_rows: List[Schedule]) -> Dict:
+    """
+    Linear-time diff of two timetable versions keyed by (section, course, day, start_time).
+    Entries only in the old version are "removed", only in the new one "added", and on both
+    sides with another room or teacher "changed". A removed and an added entry of the same
+    section and course are paired into one "moved" change.
+    """
+    old = {}
+    for row in old_rows:
+        old.setdefault(_entry_key(row), []).append(row)
+    new = {}
+    for row in new_rows:
+        new.setdefault(_entry_key(row), []).append(row)
+
+    removed, added, changes = {}, {}, []
+    for key, rows in old.items():
+        others = new.get(key, [])
+        for i, row in enumerate(rows):
+            if i >= len(others):
+                removed.setdefault(key[:2], []).append(row)
+            elif (row.room, row.faculty_id) != (others[i].room, others[i].faculty_id):
+                changes.append(("changed", row, others[i]))
+    for key, rows in new.items():
+        for row in rows[len(old.get(key, [])):]:
+            added.setdefault(key[:2], []).append(row)
+
+    # Pair removals and additions of the same section + course as moves
+    for course_key, rows in removed.items():
+        targets = added.pop(course_key, [])
+        for i, row in enumerate(rows):
+            changes.append(("moved", row, targets[i]) if i < len(targets) else ("removed", row, None))
+        changes.extend(("added", None, row) for row in targets[len(rows):])
+    changes.extend(("added", None, row) for rows in added.values() for row in rows)
+
+    result = []
+    sections, faculty = set(), set()
+    for kind, before, after in changes:
+        row = after or before
+        result.append({
+            "type": kind,
+            "section": row.section,
+            "course_id": row.course_id,
+            "course_name": row.course_name,
+            "from": _placement(before) if before else None,
+            "to": _placement(after) if after else None,
+        })
+        sections.add(row.section)
+        faculty.update(r.faculty_id for r in (before, after) if r)
+    return {"changes": result, "affected_sections": sorted(sections), "affected_faculty": sorted(faculty)}
+
+def describe_change(change: Dict) -> str:
+    def where(placement):
+        return f"{placement['day_of_week']} {placement['start_time']} (Room {placement['room']})"
+    name = f"{change['course_name']} [{change['section']}]"
+    if change["type"] == "added":
+        return f"{name} added on {where(change['to'])}"
+    if change["type"] == "removed":
+        return f"{name} on {where(change['from'])} cancelled"
+    if change["type"] == "moved":
+        return f"{name} moved from {where(change['from'])} to {where(change['to'])}"
+    return f"{name} on {change['to']['day_of_week']} {change['to']['start_time']} now in Room {change['to']['room']}"
+
+def notify_changes(session: Session, diff: Dict) -> Dict:
+    """
+    One notification per affected section and per affected faculty member, listing only their changes.
+    Returns the number of notifications created per audience.
+    """
+    by_section, by_faculty = {}, {}
+    for change in diff["changes"]:
+        text = describe_change(change)
+        by_section.setdefault(change["section"], []).append(text)
+        for placement in (change["from"], change["to"]):
+            if placement and text not in by_faculty.setdefault(placement["faculty_id"], []):
+                by_faculty[placement["faculty_id"]].append(text)
+
+    for section, lines in by_section.items():
+        session.add(Notification(section=section, title="Timetable updated", content="\n".join(lines)))
+    for faculty_id, lines in by_faculty.items():
+        session.add(Notification(user_id=faculty_id, title="Your timetable changed", content="\n".join(lines)))
+    session.commit()
+    return {"sections": len(by_section), "faculty": len(by_faculty)}
@@ -0,0 +1,162 @@
+import multiprocessing as mp
+import queue
+import threading
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+from sqlmodel import Session
+from backend.occupancy_index import invalidate_occupancy
+
+# Job states
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_EVENTS = {"completed": COMPLETED, "failed": FAILED, "cancelled": CANCELLED}
+
+def _run_generation_job(params: Dict, events, cancel, force=False):
+    """
+    Child process entry point. Runs the solver with its own DB session, streams one
+    "progress" event per generation (GA only) and saves a new draft version only on success.
+    A cached result for the same inputs is restored instead unless `force` is set.
+    """
+    from backend.database import engine
+    from backend.scheduler_ai import create_solver
+    from backend.timetable_store import save_version, input_fingerprint, load_cached_generation, store_generation, checkpoint_path, prune_checkpoints
+
+    try:
+        with Session(engine) as session:
+            fingerprint = input_fingerprint(session, params)
+            cached = None if force else load_cached_generation(session, fingerprint)
+            if cached:
+                schedule, report = cached
+                version = save_version(session, schedule, "cache")
+                events.put({"type": "completed", "slots": len(schedule),
+                            "report": {**report, "cached": True, "version_id": version.id}})
+                return
+
+            solver = create_solver(
+                session,
+                on_generation=lambda generation, best_score: events.put(
+                    {"type": "progress", "generation": generation, "best_score": best_score}),
+                should_stop=cancel.is_set,
+                checkpoint_path=checkpoint_path(fingerprint, params),
+                **params
+            )
+            schedule = solver.solve()
+            report = solver.report()
+            prune_checkpoints()
+            if report["stop_reason"] == "cancelled":
+                events.put({"type": "cancelled", "report": report})
+                return
+
+            store_generation(session, fingerprint, params, schedule, report)
+            version = save_version(session, schedule, "generate")
+            events.put({"type": "completed", "slots": len(schedule),
+                        "report": {**report, "cached": False, "version_id": version.id}})
+    except ValueError as e:
+        events.put({"type": "failed", "error": str(e)})
+    except Exception as e:
+        traceback.print_exc()
+        events.put({"type": "failed", "error": f"Optimization failed: {e}"})
+
+class GenerationJob:
+    def __init__(self, params: Dict):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = RUNNING
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self.events = [] # every event received from the worker, in order (replayed by the SSE stream)
+        self.generation = None
+        self.best_score = None
+        self.result = None
+        self.error = None
+        self.process = None
+        self.cancel_event = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "generation": self.generation,
+            "best_score": self.best_score,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class TimetableJobManager:
+    """
+    Runs timetable generation in separate processes so the API workers never block on the GA.
+    Only one job runs at a time, because a finished job replaces the whole timetable.
+    """
+    def __init__(self):
+        self.jobs: Dict[str, GenerationJob] = {}
+        self.lock = threading.Lock()
+        # spawn: never fork the API process with its open DB connections and threads
+        self.context = mp.get_context("spawn")
+
+    def active_job(self) -> Optional[GenerationJob]:
+        return next((job for job in self.jobs.values() if not job.finished), None)
+
+    def submit(self, params: Dict, force=False) -> GenerationJob:
+        with self.lock:
+            if self.active_job():
+                raise RuntimeError("A timetable generation job is already running")
+            job = GenerationJob(params)
+            events = self.context.Queue()
+            job.cancel_event = self.context.Event()
+            job.process = self.context.Process(target=_run_generation_job, args=(params, events, job.cancel_event, force))
+            job.process.start()
+            self.jobs[job.id] = job
+
+        threading.Thread(target=self._watch, args=(job, events), daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[GenerationJob]:
+        job = self.jobs.get(job_id)
+        if job and not job.finished:
+            job.cancel_event.set()
+        return job
+
+    def _watch(self, job: GenerationJob, events):
+        """
+        Drains the worker's event queue into job.events until a terminal event arrives
+        (or the worker dies without sending one).
+        """
+        while True:
+            try:
+                event = events.get(timeout=0.5)
+            except queue.Empty:
+                if job.process.is_alive():
+                    continue
+                event = {"type": "failed", "error": f"Worker exited with code {job.process.exitcode}"}
+
+            if event["type"] == "progress":
+                job.generation = event["generation"]
+                job.best_score = event["best_score"]
+            elif event["type"] == "completed":
+                job.result = {"slots": event["slots"], **event["report"]}
+                invalidate_occupancy() # the worker saved a new draft version
+            elif event["type"] in ("failed", "cancelled"):
+                job.error = event.get("error")
+                job.result = event.get("report")
+            job.events.append(event)
+
+            if event["type"] in TERMINAL_EVENTS:
+                job.status = TERMINAL_EVENTS[event["type"]]
+                job.finished_at = datetime.now().isoformat()
+                job.process.join(timeout=5)
+                return
+
+timetable_jobs = TimetableJobManager()
@@ -0,0 +1,304 @@
+import copy
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Hard constraints shared by every engine (GA fitness, CP model, validation):
+# no two allocations may use the same (entity, time) pair for each of these entities.
+HARD_CONSTRAINTS = ("teacher", "room", "section")
+
+# Soft objectives and their default weights (score points per unit):
+# idle periods between a teacher's first and last class of a day, classes over max_daily_classes
+# for a section on one day, extra classes of the same subject for a section on one day, and classes
+# in the last late_periods periods of the day
+DEFAULT_SOFT_WEIGHTS = {"teacher_gaps": 10, "section_daily_overload": 30, "repeated_subject": 20, "late_classes": 5}
+
+def clock_minutes(start_time: str) -> Tuple[int, object]:
+    """
+    Sort key for a slot start time. Slots are entered as 12-hour "HH:MM" without am/pm
+    ("01:30" comes after "11:30"), so hours before 8 are read as afternoon.
+    Unparsable times sort after all others.
+    """
+    try:
+        hours, minutes = (int(part) for part in start_time.split(":")[:2])
+    except (ValueError, AttributeError):
+        return (1, str(start_time))
+    if hours < 8:
+        hours += 12
+    return (0, hours * 60 + minutes)
+
+def dense_codes(values) -> Tuple[np.ndarray, int]:
+    """
+    Maps arbitrary hashable values onto 0..K-1 (first seen order).
+    Returns the code per value and K.
+    """
+    lookup = {}
+    codes = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        codes[i] = lookup.setdefault(value, len(lookup))
+    return codes, len(lookup)
+
+def allowed_indices(domain: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Boolean (allocations, K) domain -> (allowed indices first per row, number allowed per row).
+    """
+    counts = domain.sum(axis=1)
+    width = max(int(counts.max(initial=0)), 1)
+    choices = np.argsort(~domain, axis=1, kind="stable")[:, :width]
+    return choices, np.maximum(counts, 1) # empty rows draw index 0 instead of failing
+
+def room_domain(allocations: List, rooms: List, subjects: Dict, section_sizes: Dict) -> np.ndarray:
+    """
+    (allocations, rooms) mask of the rooms an allocation may use: big enough for its section
+    and of the room type its subject needs.
+    """
+    capacity = np.array([r.capacity for r in rooms])
+    room_types = np.array([r.room_type for r in rooms])
+    sizes = np.array([section_sizes.get(a.section_id, 0) for a in allocations])
+    needed = np.array([subjects[a.subject_id].room_type for a in allocations])
+    return (capacity[np.newaxis, :] >= sizes[:, np.newaxis]) & (room_types[np.newaxis, :] == needed[:, np.newaxis])
+
+class TimetableProblem:
+    """
+    Integer view of the generation inputs.
+
+    calculate_fitness keys its conflicts on (teacher_id, day, start_time),
+    (room.name, day, start_time) and (section_id, day, start_time), so slots that
+    share a day/start time and rooms that share a name get the same code here too.
+    Only NumPy arrays and ints are stored, so the problem is cheap to copy around.
+
+    slot_domain (allocations, slots) and room_domain (allocations, rooms) are the candidate
+    domains: a gene may only take (slot, room) pairs allowed by both. Everything is allowed
+    when they are not given.
+
+    Availability entries are compiled once into (entity, time) masks: teacher_blocked narrows the
+    slot domain, room_blocked (room names) counts as a hard conflict and teacher_penalty holds the
+    soft cost of a class of that teacher at that time, so fitness only indexes arrays.
+
+    For the soft objectives every time is also a (day, period) cell; periods are ordered by clock time.
+    """
+    def __init__(self, allocations: List, slots: List, rooms: List,
+                 slot_domain: np.ndarray = None, room_domain: np.ndarray = None,
+                 availability: List = None, preference_weight: int = 10,
+                 soft_weights: Dict = None, max_daily_classes: int = 6, late_periods: int = 1):
+        self.n_allocations = len(allocations)
+        self.n_slots = len(slots)
+        self.n_rooms = len(rooms)
+
+        # Per allocation
+        self.teacher_codes, self.n_teachers = dense_codes([a.teacher_id for a in allocations])
+        self.section_codes, self.n_sections = dense_codes([a.section_id for a in allocations])
+        # A course is one subject taught to one section
+        self.course_codes, self.n_courses = dense_codes([(a.section_id, a.subject_id) for a in allocations])
+
+        # Per slot / room
+        self.slot_time_codes, self.n_times = dense_codes([(s.day_of_week, s.start_time) for s in slots])
+        self.room_codes, self.n_room_names = dense_codes([r.name for r in rooms])
+        self.room_capacities = np.array([r.capacity for r in rooms], dtype=np.int64)
+
+        # (day, period) of every time, for the soft objectives
+        self.time_day, self.n_days = dense_codes([key[0] for key in dict.fromkeys((s.day_of_week, s.start_time) for s in slots)])
+        starts = sorted({s.start_time for s in slots}, key=clock_minutes)
+        period_of = {start: i for i, start in enumerate(starts)}
+        self.n_periods = len(starts)
+        self.time_period = np.array([period_of[key[1]] for key in dict.fromkeys((s.day_of_week, s.start_time) for s in slots)],
+                                    dtype=np.int64)
+        unknown = set(soft_weights or {}) - set(DEFAULT_SOFT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown soft constraint(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(DEFAULT_SOFT_WEIGHTS)}")
+        self.soft_weights = {**DEFAULT_SOFT_WEIGHTS, **(soft_weights or {})}
+        self.max_daily_classes = max_daily_classes
+        self.time_late = self.time_period >= self.n_periods - late_periods
+
+        self.compile_availability(allocations, slots, rooms, availability or [], preference_weight)
+
+        # Candidate domains, plus the allowed indices per allocation for sampling
+        if slot_domain is None:
+            slot_domain = np.ones((self.n_allocations, self.n_slots), dtype=bool)
+        # Never at a time the teacher is unavailable
+        slot_domain = slot_domain & ~self.teacher_blocked[self.teacher_codes][:, self.slot_time_codes]
+        if room_domain is None:
+            room_domain = np.ones((self.n_allocations, self.n_rooms), dtype=bool)
+        self.slot_domain = slot_domain
+        self.room_domain = room_domain
+        self.slot_choices, self.slot_counts = allowed_indices(slot_domain)
+        self.room_choices, self.room_counts = allowed_indices(room_domain)
+        # Same per room name: (allocations, room names)
+        self.room_name_domain = (room_domain.astype(np.int64) @ np.eye(self.n_room_names, dtype=np.int64)[self.room_codes]) > 0
+
+    def compile_availability(self, allocations: List, slots: List, rooms: List, entries: List, preference_weight: int):
+        """
+        Availability rows -> teacher_blocked (teachers, times), teacher_penalty (teachers, times) and
+        room_blocked (room names, times). An entry without start_time covers every time of its day.
+        Teachers with "preferred" entries pay preference_weight per class outside them, "avoid"
+        entries cost preference_weight per class. Entries for unknown teachers, rooms or times are ignored.
+        """
+        teacher_lookup = {a.teacher_id: int(code) for a, code in zip(allocations, self.teacher_codes)}
+        room_lookup = {r.id: int(code) for r, code in zip(rooms, self.room_codes)}
+        time_lookup, day_times = {}, {}
+        for slot, code in zip(slots, self.slot_time_codes.tolist()):
+            time_lookup[(slot.day_of_week, slot.start_time)] = code
+            day_times.setdefault(slot.day_of_week, set()).add(code)
+
+        self.teacher_blocked = np.zeros((self.n_teachers, self.n_times), dtype=bool)
+        self.room_blocked = np.zeros((self.n_room_names, self.n_times), dtype=bool)
+        preferred = np.zeros((self.n_teachers, self.n_times), dtype=bool)
+        avoided = np.zeros((self.n_teachers, self.n_times), dtype=bool)
+        for entry in entries:
+            if entry.start_time is None:
+                times = sorted(day_times.get(entry.day_of_week, ()))
+            else:
+                key = (entry.day_of_week, entry.start_time)
+                times = [time_lookup[key]] if key in time_lookup else []
+            if entry.user_id in teacher_lookup:
+                mask = {"unavailable": self.teacher_blocked, "preferred": preferred, "avoid": avoided}.get(entry.kind)
+                if mask is not None:
+                    mask[teacher_lookup[entry.user_id], times] = True
+            elif entry.room_id in room_lookup and entry.kind == "unavailable":
+                self.room_blocked[room_lookup[entry.room_id], times] = True
+
+        outside_preferred = preferred.any(axis=1)[:, np.newaxis] & ~preferred
+        self.teacher_penalty = preference_weight * (outside_preferred.astype(np.int64) + avoided)
+        # Fitness skips the terms nobody uses
+        self.has_room_blocks = bool(self.room_blocked.any())
+        self.has_preferences = bool(self.teacher_penalty.any())
+
+    def sample(self, rng: np.random.Generator, genes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Uniform (slot, room) draws from the domains of `genes` (any shape).
+        Allocations with an empty domain should have been rejected before sampling.
+        """
+        genes = np.asarray(genes)
+        slots = self.slot_choices[genes, rng.integers(0, self.slot_counts[genes])]
+        rooms = self.room_choices[genes, rng.integers(0, self.room_counts[genes])]
+        return slots, rooms
+
+    def entity_codes(self, constraint: str, rooms: np.ndarray = None) -> np.ndarray:
+        """
+        Entity code per gene for one of HARD_CONSTRAINTS. Teachers and sections are fixed per
+        allocation; rooms come from the room genes (`rooms`, any shape).
+        """
+        if constraint == "teacher":
+            return self.teacher_codes
+        if constraint == "section":
+            return self.section_codes
+        return self.room_codes[rooms]
+
+    def n_entities(self, constraint: str) -> int:
+        return {"teacher": self.n_teachers, "room": self.n_room_names, "section": self.n_sections}[constraint]
+
+    def room_groups(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Room capacity per time as counting constraints: for every distinct room-name domain, the
+        allocations whose rooms all lie inside it (groups, allocations) and how many of its names are
+        available at each time (groups, times). Groups that can never overflow are left out.
+        Domains built by room_domain are nested per room type, so classes at one time can be given
+        distinct rooms exactly when no group holds more of them than it has names (Hall's condition).
+        """
+        names = self.room_name_domain
+        groups = np.unique(names, axis=0)
+        members = ~(names[np.newaxis, :, :] & ~groups[:, np.newaxis, :]).any(axis=2)
+        sizes = (groups[:, :, np.newaxis] & ~self.room_blocked[np.newaxis, :, :]).sum(axis=1)
+        keep = members.sum(axis=1) > sizes.min(axis=1)
+        return members[keep], sizes[keep]
+
+    def match_rooms(self, slots: np.ndarray, rooms: np.ndarray = None, fixed: np.ndarray = None) -> np.ndarray:
+        """
+        Rooms for a slot assignment: per time, a maximum bipartite matching of the classes onto distinct
+        room names of their domain open at that time (augmenting paths; most constrained class first, smallest rooms
+        tried first so big rooms stay free for big sections).
+        Genes in the `fixed` mask keep their room from `rooms` and block its name at that time.
+        Returns the room index per gene, -1 where no room was left.
+        """
+        times = self.slot_time_codes[slots]
+        result = np.full(self.n_allocations, -1, dtype=np.int64)
+        if fixed is not None:
+            result[fixed] = rooms[fixed]
+
+        name_capacity = np.full(self.n_room_names, np.iinfo(np.int64).max)
+        np.minimum.at(name_capacity, self.room_codes, self.room_capacities)
+        name_order = np.argsort(name_capacity, kind="stable")
+        # Smallest allowed room per (gene, name) once a name is matched
+        room_order = np.argsort(self.room_capacities, kind="stable")
+
+        for t in np.unique(times).tolist():
+            at_time = times == t
+            owner = {} # room name -> gene using it
+            if fixed is not None:
+                for gene in np.flatnonzero(at_time & fixed).tolist():
+                    owner[int(self.room_codes[result[gene]])] = None
+                at_time &= ~fixed
+            genes = np.flatnonzero(at_time)
+            genes = genes[np.argsort(self.room_name_domain[genes].sum(axis=1), kind="stable")]
+            open_names = name_order[~self.room_blocked[name_order, t]]
+            candidates = {gene: open_names[self.room_name_domain[gene, open_names]].tolist() for gene in genes.tolist()}
+
+            def augment(gene, seen):
+                for name in candidates[gene]:
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                    holder = owner.get(name, -1)
+                    if holder == -1 or (holder is not None and augment(holder, seen)):
+                        owner[name] = gene
+                        return True
+                return False
+
+            for gene in genes.tolist():
+                augment(gene, set())
+            for name, gene in owner.items():
+                if gene is not None:
+                    allowed = room_order[self.room_domain[gene, room_order] & (self.room_codes[room_order] == name)]
+                    result[gene] = allowed[0]
+        return result
+
+    def subset(self, genes: np.ndarray) -> "TimetableProblem":
+        """
+        The same problem restricted to the allocations `genes` (slots, rooms and entity codes unchanged).
+        """
+        sub = copy.copy(self)
+        sub.n_allocations = len(genes)
+        for name in ("teacher_codes", "section_codes", "course_codes", "slot_domain", "room_domain", "room_name_domain",
+                     "slot_choices", "slot_counts", "room_choices", "room_counts"):
+            setattr(sub, name, getattr(self, name)[genes])
+        return sub
+
+    def components(self) -> List[np.ndarray]:
+        """
+        Connected components of the allocation interaction graph: allocations are linked when they
+        share a teacher, a section or a room name both may use. Different components can never
+        conflict, so they can be solved separately. Largest first.
+        """
+        # Union-find over allocation, teacher, section, room name and room domain nodes
+        # (allocations with the same room domain share one domain node, so rooms cost O(domains x rooms))
+        domains, domain_of = np.unique(self.room_name_domain, axis=0, return_inverse=True)
+        domain_of = domain_of.reshape(-1)
+        teacher_base = self.n_allocations
+        section_base = teacher_base + self.n_teachers
+        room_base = section_base + self.n_sections
+        domain_base = room_base + self.n_room_names
+        parent = list(range(domain_base + len(domains)))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        def union(a, b):
+            a, b = find(a), find(b)
+            if a != b:
+                parent[b] = a
+
+        for d, domain in enumerate(domains):
+            for name in np.flatnonzero(domain).tolist():
+                union(domain_base + d, room_base + name)
+        for gene in range(self.n_allocations):
+            union(gene, teacher_base + int(self.teacher_codes[gene]))
+            union(gene, section_base + int(self.section_codes[gene]))
+            union(gene, domain_base + int(domain_of[gene]))
+
+        roots = np.array([find(gene) for gene in range(self.n_allocations)])
+        _, labels = np.unique(roots, return_inverse=True)
+        order = np.argsort(labels, kind="stable")
+        groups = np.split(order, np.cumsum(np.bincount(labels))[:-1])
+        return sorted(groups, key=len, reverse=True)
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session, select, delete
+from backend.models import Schedule, CourseAllocation, Room, TimeSlot, Subject, User, GenerationResult, TimetableVersion, PublishedTimetable, Availability
+
+# Schedule fields kept in the generation cache
+SCHEDULE_FIELDS = ("course_id", "section", "course_name", "faculty_id", "day_of_week", "start_time", "end_time", "room")
+
+# Unpublished versions kept besides the published one and its rollback target
+KEEP_VERSIONS = 10
+
+# GA checkpoints of unfinished runs, one file per input fingerprint
+CHECKPOINT_DIR = "checkpoints"
+# Checkpoints untouched this long (seconds) belong to inputs that changed since or runs nobody resumed
+CHECKPOINT_MAX_AGE = 7 * 24 * 3600
+
+def save_version(session: Session, schedules: List[Schedule], source: str) -> TimetableVersion:
+    """
+    Writes `schedules` as a new draft version in a single transaction. The published version is
+    untouched until publish_version() switches the pointer, so a failed or cancelled run never
+    leaves anyone with an empty or half-written timetable.
+    """
+    version = TimetableVersion(source=source, slots=len(schedules))
+    session.add(version)
+    session.flush()
+    for sched in schedules:
+        sched.version_id = version.id
+        session.add(sched)
+    prune_versions(session, keep={version.id})
+    session.commit()
+    session.refresh(version)
+    return version
+
+def prune_versions(session: Session, keep=()):
+    """
+    Deletes the rows of old drafts beyond KEEP_VERSIONS (never the published version or its rollback target).
+    """
+    pointer = session.get(PublishedTimetable, 1)
+    protected = set(keep)
+    if pointer:
+        protected |= {pointer.version_id, pointer.previous_version_id}
+    old = session.exec(select(TimetableVersion.id).order_by(TimetableVersion.id.desc()).offset(KEEP_VERSIONS)).all()
+    stale = [version_id for version_id in old if version_id not in protected]
+    if stale:
+        session.exec(delete(Schedule).where(Schedule.version_id.in_(stale)))
+        session.exec(delete(TimetableVersion).where(TimetableVersion.id.in_(stale)))
+
+def published_version_id(session: Session) -> Optional[int]:
+    pointer = session.get(PublishedTimetable, 1)
+    return pointer.version_id if pointer else None
+
+def latest_version_id(session: Session) -> Optional[int]:
+    """
+    The current draft: the newest version, published or not.
+    """
+    return session.exec(select(TimetableVersion.id).order_by(TimetableVersion.id.desc())).first()
+
+def version_rows(session: Session, version_id: Optional[int]) -> List[Schedule]:
+    if version_id is None:
+        return []
+    return session.exec(select(Schedule).where(Schedule.version_id == version_id)).all()
+
+def publish_version(session: Session, version_id: int) -> PublishedTimetable:
+    """
+    Atomic O(1) publish: one UPDATE of the pointer row.
+    """
+    pointer = session.get(PublishedTimetable, 1) or PublishedTimetable(id=1)
+    if pointer.version_id != version_id:
+        pointer.previous_version_id = pointer.version_id
+        pointer.version_id = version_id
+    pointer.published_at = datetime.now().isoformat()
+    session.add(pointer)
+    session.commit()
+    session.refresh(pointer)
+    return pointer
+
+def rollback_version(session: Session) -> Optional[PublishedTimetable]:
+    """
+    Re-publishes the version that was published before the current one (None if there is none).
+    """
+    pointer = session.get(PublishedTimetable, 1)
+    if pointer is None or pointer.previous_version_id is None:
+        return None
+    return publish_version(session, pointer.previous_version_id)
+
+def apply_repair(session: Session, rows: List[Optional[Schedule]], orphans: List[Schedule], schedules: List[Schedule]):
+    """
+    Saves an incremental repair as a new draft version and counts the churn against the old one.
+    rows[i] is the existing row of allocation i (None if new), schedules[i] its repaired entry;
+    orphans (rows of removed allocations) are left out of the new version.
+    Returns the counts and the new version.
+    """
+    counts = {"kept": 0, "moved": 0, "added": 0, "removed": len(orphans)}
+    for row, sched in zip(rows, schedules):
+        if row is None:
+            counts["added"] += 1
+        elif (row.day_of_week, row.start_time, row.room) != (sched.day_of_week, sched.start_time, sched.room):
+            counts["moved"] += 1
+        else:
+            counts["kept"] += 1
+    return counts, save_version(session, schedules, "repair")
+
+def input_fingerprint(session: Session, params: Dict) -> str:
+    """
+    sha256 over everything a generation run reads: allocations, rooms, time slots, subjects,
+    section sizes, availability, the solver params and (for warm starts) the current timetable versions.
+    """
+    inputs = {
+        "allocations": [[a.id, a.subject_id, a.teacher_id, a.section_id]
+                        for a in session.exec(select(CourseAllocation).order_by(CourseAllocation.id)).all()],
+        "rooms": [[r.id, r.name, r.capacity, r.room_type] for r in session.exec(select(Room).order_by(Room.id)).all()],
+        "slots": [[t.id, t.day_of_week, t.start_time, t.end_time]
+                  for t in session.exec(select(TimeSlot).order_by(TimeSlot.id)).all()],
+        "subjects": [[s.id, s.name, s.code, s.room_type] for s in session.exec(select(Subject).order_by(Subject.id)).all()],
+        "section_sizes": sorted(Counter(u.section for u in session.exec(select(User).where(User.role == "student")).all()).items(),
+                                key=str),
+        "availability": [[e.id, e.user_id, e.room_id, e.day_of_week, e.start_time, e.kind]
+                         for e in session.exec(select(Availability).order_by(Availability.id)).all()],
+        "params": params,
+    }
+    if params.get("warm_start"):
+        # Versions are immutable, so their ids identify the timetable a warm start reads
+        inputs["versions"] = [published_version_id(session), latest_version_id(session)]
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def checkpoint_path(fingerprint: str, params: Dict) -> Optional[str]:
+    """
+    Where a run with this fingerprint checkpoints (None when checkpointing is off). The same request
+    after a crash or restart has the same fingerprint, so it finds and resumes the checkpoint.
+    """
+    if not params.get("checkpoint_interval"):
+        return None
+    return os.path.join(CHECKPOINT_DIR, f"{fingerprint}.npz")
+
+def prune_checkpoints(max_age=CHECKPOINT_MAX_AGE):
+    """
+    Deletes checkpoint files (and half-written .tmp files) not modified for max_age seconds.
+    Called after every generation run, so fingerprints that never recur do not pile up.
+    """
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(CHECKPOINT_DIR):
+        path = os.path.join(CHECKPOINT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass # removed meanwhile by the run that owns it
+
+def load_cached_generation(session: Session, fingerprint: str) -> Optional[Tuple[List[Schedule], Dict]]:
+    """
+    (fresh Schedule rows, report) of a previous successful run with the same fingerprint, or None.
+    """
+    entry = session.exec(select(GenerationResult).where(GenerationResult.fingerprint == fingerprint)).first()
+    if entry is None:
+        return None
+    schedules = [Schedule(**fields) for fields in json.loads(entry.schedule)]
+    return schedules, json.loads(entry.report)
+
+def store_generation(session: Session, fingerprint: str, params: Dict, schedules: List[Schedule], report: Dict):
+    """
+    Remembers a run under its fingerprint if it produced a conflict-free timetable
+    (a forced re-run replaces the previous entry).
+    """
+    if report.get("stop_reason") == "cancelled" or report.get("hard_conflicts") != 0:
+        return
+    entry = session.exec(select(GenerationResult).where(GenerationResult.fingerprint == fingerprint)).first()
+    if entry is None:
+        entry = GenerationResult(fingerprint=fingerprint, params="", schedule="", report="")
+    entry.params = json.dumps(params, default=str)
+    entry.schedule = json.dumps([{field: getattr(sched, field) for field in SCHEDULE_FIELDS} for sched in schedules])
+    entry.report = json.dumps(report)
+    entry.created_at = datetime.now().isoformat()
+    session.add(entry)
+    session.commit()
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.pool import StaticPool
+from backend.models import Room, TimeSlot, Subject, CourseAllocation
+from backend.scheduler_ai import create_solver
+
+# Offline benchmark for timetable generation on synthetic, seeded institutions.
+# Usage: python benchmark_generation.py --sizes small medium --output benchmark_results.json
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+TIMES = [("09:30", "10:30"), ("10:30", "11:30"), ("11:30", "12:30"),
+         ("01:30", "02:30"), ("02:30", "03:30"), ("03:30", "04:30"), ("04:30", "05:30")]
+
+# 42 slots (6 days x 7 periods) everywhere, like seed_full_timetable.py
+FIXTURES = {
+    "small": {"rooms": 5, "sections": 3, "teachers": 3, "subjects": 8, "allocations": 67},
+    "medium": {"rooms": 40, "sections": 30, "teachers": 40, "subjects": 40, "allocations": 600},
+    "large": {"rooms": 200, "sections": 120, "teachers": 150, "subjects": 120, "allocations": 3000},
+}
+
+def build_institution(session: Session, size: str, seed: int):
+    """
+    Fills an empty database with a reproducible synthetic institution.
+    Allocations are spread evenly over sections and teachers so every fixture stays feasible.
+    """
+    spec = FIXTURES[size]
+    rng = random.Random(seed)
+
+    for i in range(spec["rooms"]):
+        session.add(Room(name=f"R{i + 1:03d}", capacity=rng.choice([30, 60, 60, 90])))
+    for day in DAYS:
+        for start, end in TIMES:
+            session.add(TimeSlot(day_of_week=day, start_time=start, end_time=end))
+    subjects = [Subject(name=f"Subject {i + 1}", code=f"SUB-{i + 1:03d}", credits=rng.choice([1, 2, 3, 4]))
+                for i in range(spec["subjects"])]
+    for subject in subjects:
+        session.add(subject)
+    session.commit()
+
+    sections = [f"S{i + 1:03d}" for i in range(spec["sections"])]
+    teachers = list(range(1000, 1000 + spec["teachers"]))
+    for i in range(spec["allocations"]):
+        session.add(CourseAllocation(
+            subject_id=rng.choice(subjects).id,
+            teacher_id=teachers[i % len(teachers)],
+            section_id=sections[(i * 7 + rng.randrange(2)) % len(sections)]
+        ))
+    session.commit()
+
+def solve(size: str, seed: int, params: dict, trace_memory=False):
+    """
+    Builds the fixture in a fresh in-memory database and solves it once.
+    Returns (report, elapsed seconds, peak traced memory in bytes or None).
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        build_institution(session, size, seed)
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.monotonic()
+        solver = create_solver(session, seed=seed, **params)
+        solver.solve()
+        elapsed = time.monotonic() - started
+        peak = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return solver.report(), elapsed, peak
+
+def run_benchmark(size: str, seed: int, params: dict):
+    # Timing and memory come from two separate runs of the same seeded problem: tracemalloc hooks
+    # every allocation and slows the numpy engine several times over
+    report, elapsed, _ = solve(size, seed, params)
+    _, _, peak = solve(size, seed, params, trace_memory=True)
+
+    # Feasible = no hard conflicts (the score only reaches 1000 when the soft penalty is 0 too)
+    first_feasible = report.get("first_feasible") or {}
+    if not first_feasible and report.get("hard_conflicts") == 0:
+        first_feasible = {"seconds": elapsed, "generation": report["generations"]}
+
+    return {
+        "fixture": size,
+        "allocations": FIXTURES[size]["allocations"],
+        "engine": report["engine"],
+        "stop_reason": report["stop_reason"],
+        "generations": report["generations"],
+        "generations_per_second": round(report["generations"] / elapsed, 2) if elapsed > 0 else None,
+        "seconds_to_first_feasible": round(first_feasible["seconds"], 3) if first_feasible else None,
+        "generation_of_first_feasible": first_feasible.get("generation"),
+        "elapsed_seconds": round(elapsed, 3),
+        "peak_memory_mb": round(peak / 2**20, 2),
+        "final_score": report["best_score"],
+        "hard_conflicts": report.get("hard_conflicts"),
+        "soft_penalty": report.get("soft_penalty"),
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline timetable generation benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(FIXTURES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engine", default="ga")
+    parser.add_argument("--population-size", type=int, default=100)
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--max-seconds", type=float, default=300.0)
+    parser.add_argument("--greedy-seed-ratio", type=float, default=0.2)
+    parser.add_argument("--local-search", default=None, choices=["elite", "end"])
+    parser.add_argument("--two-phase", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    params = {
+        "engine": args.engine,
+        "population_size": args.population_size,
+        "generations": args.generations,
+        "max_seconds": args.max_seconds,
+        "greedy_seed_ratio": args.greedy_seed_ratio,
+        "local_search": args.local_search,
+        "two_phase": args.two_phase,
+    }
+
+    results = []
+    for size in args.sizes:
+        print(f"--- {size} ---")
+        result = run_benchmark(size, args.seed, params)
+        print(json.dumps(result, indent=2))
+        results.append(result)
+
+    # Runs are appended so results can be compared over time
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            history = json.load(f)
+    history.append({
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "seed": args.seed,
+        "params": params,
+        "results": results,
+    })
+    with open(args.output, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from sqlmodel import Session
+from backend.database import engine
+from backend.timetable_algorithm import TimetableGeneticAlgorithm
+
+# Generations needed to reach a conflict-free timetable for each seeding strategy (same seeds for every strategy)
+STRATEGIES = {
+    "random": 0.0,
+    "greedy 20%": 0.2,
+    "greedy 50%": 0.5,
+}
+RUNS = 10
+
+def compare_seeding():
+    with Session(engine) as session:
+        print(f"{'Strategy':<12} {'Solved':>7} {'Avg gens':>9} {'Max gens':>9}")
+        for name, ratio in STRATEGIES.items():
+            generations = []
+            solved = 0
+            for seed in range(RUNS):
+                ga = TimetableGeneticAlgorithm(session, seed=seed, greedy_seed_ratio=ratio)
+                ga.generate()
+                feasible = ga.first_feasible
+                generations.append(feasible["generation"] if feasible else ga.generations_run)
+                solved += ga.hard_conflicts == 0
+            print(f"{name:<12} {solved:>4}/{RUNS} {sum(generations) / RUNS:>9.1f} {max(generations):>9}")
+
+if __name__ == "__main__":
+    compare_seeding()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+from backend.models import Availability, CourseAllocation, Room, Subject, TimeSlot, User
+from backend.timetable_algorithm import TimetableGeneticAlgorithm
+from backend.fitness_engine import IncrementalFitness
+
+# python (calculate_fitness), numpy (PopulationFitnessEngine) and incremental (IncrementalFitness)
+# must give the same score for any chromosome, availability and soft objectives included.
+# Run with: python -m pytest test_fitness_engines.py
+
+DAYS = ["Monday", "Tuesday", "Wednesday"]
+TIMES = [("09:30", "10:30"), ("10:30", "11:30"), ("11:30", "12:30"),
+         ("01:30", "02:30"), ("02:30", "03:30"), ("03:30", "04:30")]
+NO_SOFT = {"teacher_gaps": 0, "section_daily_overload": 0, "repeated_subject": 0, "late_classes": 0}
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        rooms = [Room(name="101", capacity=60), Room(name="102", capacity=60),
+                 Room(name="Lab A", capacity=60, room_type="lab")]
+        subjects = [Subject(name=f"Subject {i}", code=f"SUB-{i}", room_type="lab" if i == 0 else "lecture")
+                    for i in range(4)]
+        teachers = [User(full_name=f"Faculty {i}", email=f"faculty{i}@x", hashed_password="x", role="faculty")
+                    for i in range(3)]
+        session.add_all(rooms + subjects + teachers)
+        for day in DAYS:
+            for start, end in TIMES:
+                session.add(TimeSlot(day_of_week=day, start_time=start, end_time=end))
+        session.commit()
+
+        for i in range(30):
+            session.add(CourseAllocation(subject_id=subjects[i % 4].id, teacher_id=teachers[i % 3].id,
+                                         section_id="AB"[i % 2]))
+        session.commit()
+        yield session
+
+@pytest.fixture
+def availability(session):
+    teachers = session.exec(select(User)).all()
+    session.add(Availability(user_id=teachers[0].id, day_of_week="Monday", start_time="09:30"))
+    session.add(Availability(user_id=teachers[1].id, day_of_week="Tuesday", kind="avoid"))
+    session.add(Availability(user_id=teachers[2].id, day_of_week="Wednesday", kind="preferred"))
+    session.add(Availability(room_id=session.exec(select(Room)).first().id, day_of_week="Tuesday"))
+    session.commit()
+    return session
+
+def test_numpy_engine_matches_calculate_fitness(session):
+    # Hard conflicts only: random chromosomes are full of teacher, room and section clashes
+    ga = TimetableGeneticAlgorithm(session, seed=1, population_size=50, greedy_seed_ratio=0, soft_weights=NO_SOFT)
+    population = ga.initialize_population()
+    python_scores = [ga.calculate_fitness(chromosome) for chromosome in population]
+    assert ga.engine.score(population).tolist() == python_scores
+    assert min(python_scores) < 1000
+
+def test_engines_agree_after_random_moves(availability):
+    session = availability
+    ga = TimetableGeneticAlgorithm(session, seed=1, preference_weight=7, max_daily_classes=3)
+    p = ga.problem
+    assert p.room_blocked.any() and p.has_preferences
+
+    rng = np.random.default_rng(0)
+    chromosome = ga.initialize_population(size=1)[0].copy()
+    state = IncrementalFitness(p, chromosome)
+    for _ in range(200):
+        gene = int(rng.integers(p.n_allocations))
+        slot, room = p.sample(rng, gene)
+        state.move(chromosome, gene, int(slot), int(room))
+
+        python_score = ga.calculate_fitness(chromosome)
+        assert ga.engine.score(chromosome[np.newaxis])[0] == python_score
+        assert state.score == python_score
+        assert IncrementalFitness(p, chromosome).score == python_score
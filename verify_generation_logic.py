@@ -33,47 +33,16 @@ def verify_schedule():
     print(f"Found {len(drafts)} draft classes.")
 
     if len(drafts) > 0:
-        # Check for Conflicts
+        # Check for Conflicts (server-side, single pass over the draft)
         print("\n--- CHECKING FOR CONFLICTS ---")
-        param_conflict = []
-        
-        # Group by TimeSlot
-        from collections import defaultdict
-        slot_map = defaultdict(list)
-        
-        for d in drafts:
-            # Key: Day + StartTime
-            key = f"{d['day_of_week']} {d['start_time']}"
-            slot_map[key].append(d)
+        conflicts = requests.get(f"{BASE_URL}/timetable/conflicts").json()["conflicts"]
+        for c in conflicts:
+            print(f"[CONFLICT] {c['type'].capitalize()} {c['entity']} Double Booked at {c['day_of_week']} {c['start_time']}: entries {c['schedule_ids']}")
 
-        conflict_count = 0
-        for key, classes in slot_map.items():
-            # Check Teacher Conflicts
-            teachers = [c['faculty_id'] for c in classes]
-            if len(teachers) != len(set(teachers)):
-                print(f"[CONFLICT] Teacher Double Booked at {key}: {teachers}")
-                conflict_count += 1
-            
-            # Check Room Conflicts
-            rooms = [c['room'] for c in classes]
-            if len(rooms) != len(set(rooms)):
-                print(f"[CONFLICT] Room Double Booked at {key}: {rooms}")
-                conflict_count += 1
-                
-            # Check Section Conflicts
-            sections = [c['section'] for c in classes]
-            if len(sections) != len(set(sections)):
-                 pass 
-                 # Wait, multiple classes for Section A at same time?
-                 # Actually, a section CANNOT have 2 classes at once.
-                 if len(sections) != len(set(sections)):
-                     print(f"[CONFLICT] Section Double Booked at {key}: {sections}")
-                     conflict_count += 1
-        
-        if conflict_count == 0:
+        if len(conflicts) == 0:
             print(">> NO CONFLICTS DETECTED <<")
         else:
-            print(f">> FOUND {conflict_count} CONFLICTS <<")
+            print(f">> FOUND {len(conflicts)} CONFLICTS <<")
 
     print("\n4. Publishing Timetable...")
     # Publish